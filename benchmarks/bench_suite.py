@@ -0,0 +1,293 @@
+"""
+Benchmark suite: the ORM's hot paths against SQLite.
+
+Each benchmark times single operations and reports ops/sec, p50/p99 latency,
+peak Python memory and queries per operation (the last two from one extra
+traced run, so tracing doesn't skew the timings). Results can be saved as
+JSON and compared with an earlier run to spot regressions.
+
+    python -m benchmarks.bench_suite --rows 10000 --save baseline.json
+    python -m benchmarks.bench_suite --compare baseline.json
+    python -m benchmarks.bench_suite --only save_insert filter_pk --database /tmp/bench.db
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sqlite3
+import sys
+import time
+import tracemalloc
+
+from src.orm import connection, instrumentation
+from src.orm.fields import FloatField, ForeignKey, IntegerField, StringField
+from src.orm.model import Model
+
+
+class Company(Model):
+    name = StringField(max_length=50)
+
+
+class Person(Model):
+    name = StringField(max_length=50)
+    company = ForeignKey(Company)
+
+
+class Payslip(Model):
+    code = StringField(max_length=20)
+    amount = FloatField()
+    month = IntegerField()
+    person = ForeignKey(Person)
+
+
+MODELS = (Company, Person, Payslip)
+
+
+def populate(rows):
+    """rows payslips over rows/100 people over rows/1000 companies."""
+    companies = Company.bulk_create([Company(name=f"c{i}") for i in range(max(1, rows // 1000))])
+    people = Person.bulk_create([Person(name=f"p{i}", company=companies[i % len(companies)])
+                                 for i in range(max(1, rows // 100))])
+    Payslip.bulk_create([Payslip(code=f"x{i}", amount=i * 1.5, month=i % 12, person=people[i % len(people)])
+                         for i in range(rows)])
+    return people
+
+
+# ---------- benchmarks ----------
+# Each factory prepares its data (untimed) and returns (op, number of ops); op(i) is one timed operation.
+
+def bench_save_insert(ctx, count):
+    people = ctx["people"]
+
+    def op(i):
+        Payslip(code=f"n{i}", amount=1.0, month=1, person=people[i % len(people)]).save()
+    return op, count
+
+
+def bench_save_update(ctx, count):
+    slips = list(Payslip.objects().limit(count))
+
+    def op(i):
+        slip = slips[i % len(slips)]
+        slip.amount += 1
+        slip.save()
+    return op, count
+
+
+def bench_bulk_create(ctx, count):
+    people = ctx["people"]
+    batch = 1000
+
+    def op(i):
+        Payslip.bulk_create([Payslip(code=f"b{i}", amount=2.0, month=2, person=people[j % len(people)])
+                             for j in range(batch)])
+    return op, max(1, count // 50)
+
+
+def bench_filter_pk(ctx, count):
+    rng = random.Random(1)
+    rows = ctx["rows"]
+
+    def op(i):
+        list(Payslip.objects().filter(id=rng.randint(1, rows)))
+    return op, count
+
+
+def bench_filter_column(ctx, count):
+    # `code` has no index, every lookup scans the table
+    rng = random.Random(2)
+    rows = ctx["rows"]
+
+    def op(i):
+        list(Payslip.objects().filter(code=f"x{rng.randrange(rows)}"))
+    return op, max(1, count // 10)
+
+
+def _fk_read(queryset):
+    def op(i):
+        for slip in queryset.all():
+            slip.person.company
+    return op
+
+
+def bench_fk_read(ctx, count):
+    # ForeignKeys resolved row by row by from_row
+    return _fk_read(Payslip.objects().order_by("id").limit(100)), max(1, count // 10)
+
+
+def bench_fk_read_select_related(ctx, count):
+    return _fk_read(Payslip.objects().select_related("person__company").order_by("id").limit(100)), count
+
+
+def bench_fk_read_prefetch(ctx, count):
+    return _fk_read(Payslip.objects().prefetch_related("person__company").order_by("id").limit(100)), count
+
+
+def bench_scan(ctx, count):
+    def op(i):
+        for _ in Payslip.objects().values_list("id", "code", "amount", "month"):
+            pass
+    return op, max(1, count // 50)
+
+
+def bench_scan_columns(ctx, count):
+    def op(i):
+        Payslip.objects().to_columns("id", "amount", "month", "person", use_numpy=False)
+    return op, max(1, count // 50)
+
+
+def bench_scan_iterator(ctx, count):
+    def op(i):
+        for _ in Person.objects().iterator(chunk_size=1000):
+            pass
+    return op, max(1, count // 10)
+
+
+def bench_delete(ctx, count):
+    people = ctx["people"]
+    doomed = Payslip.bulk_create([Payslip(code="d", amount=0.0, month=0, person=people[0])
+                                  for _ in range(count + 2)])
+
+    def op(i):
+        doomed[i].delete()
+    return op, count
+
+
+BENCHMARKS = {
+    "save_insert": bench_save_insert,
+    "save_update": bench_save_update,
+    "bulk_create": bench_bulk_create,
+    "filter_pk": bench_filter_pk,
+    "filter_column": bench_filter_column,
+    "fk_read": bench_fk_read,
+    "fk_read_select_related": bench_fk_read_select_related,
+    "fk_read_prefetch": bench_fk_read_prefetch,
+    "scan": bench_scan,
+    "scan_columns": bench_scan_columns,
+    "scan_iterator": bench_scan_iterator,
+    "delete": bench_delete,
+}
+
+
+# ---------- running ----------
+
+def percentile(sorted_values, pct):
+    index = min(len(sorted_values) - 1, max(0, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def run(name, factory, ctx, count):
+    op, count = factory(ctx, count)
+    op(-1)  # warm up caches and the pool
+
+    latencies = []
+    clock = time.perf_counter
+    for i in range(count):
+        start = clock()
+        op(i)
+        latencies.append(clock() - start)
+
+    # One more run, traced, for memory and query counts
+    tracemalloc.start()
+    with instrumentation.capture_queries() as queries:
+        op(count)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    latencies.sort()
+    total = sum(latencies)
+    return {
+        "ops": count,
+        "ops_per_sec": count / total if total else float("inf"),
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "peak_kb": peak / 1024,
+        "queries_per_op": len(queries),
+    }
+
+
+def report(results, baseline=None, tolerance=10.0):
+    """
+    Print the result table; returns the names that got slower than `tolerance` percent
+    or run more queries per operation than in the baseline.
+    """
+    header = f"{'benchmark':<24} {'ops/sec':>11} {'p50 ms':>9} {'p99 ms':>9} {'peak KB':>9} {'queries':>7}"
+    if baseline:
+        header += f" {'vs base':>8}"
+    print(header)
+    print("-" * len(header))
+    regressions = []
+    for name, r in results.items():
+        line = (f"{name:<24} {r['ops_per_sec']:>11,.1f} {r['p50_ms']:>9.3f} {r['p99_ms']:>9.3f} "
+                f"{r['peak_kb']:>9.1f} {r['queries_per_op']:>7}")
+        base = (baseline or {}).get(name)
+        if base:
+            change = (r["ops_per_sec"] / base["ops_per_sec"] - 1) * 100
+            line += f" {change:>+7.1f}%"
+            if change < -tolerance:
+                regressions.append(name)
+                line += "  SLOWER"
+            if r["queries_per_op"] > base["queries_per_op"]:
+                # Unlike timings, query counts don't vary between runs
+                if name not in regressions:
+                    regressions.append(name)
+                line += f"  queries {base['queries_per_op']} -> {r['queries_per_op']}"
+        print(line)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=10_000, help="payslip rows to populate")
+    parser.add_argument("--ops", type=int, default=500, help="base number of timed operations")
+    parser.add_argument("--database", help="SQLite file, a temporary scratch file by default")
+    parser.add_argument("--only", nargs="+", choices=sorted(BENCHMARKS), help="run just these")
+    parser.add_argument("--save", metavar="FILE", help="write the results as JSON")
+    parser.add_argument("--compare", metavar="FILE", help="compare with results saved earlier")
+    parser.add_argument("--tolerance", type=float, default=10.0,
+                        help="percent of ops/sec lost before --compare reports a regression")
+    args = parser.parse_args()
+
+    if args.database is not None and os.path.exists(args.database):
+        os.remove(args.database)
+    connection.use_sqlite(args.database)
+    for model in MODELS:
+        model.create_table()
+    ctx = {"rows": args.rows, "people": populate(args.rows)}
+    print(f"SQLite {sqlite3.sqlite_version}, {args.rows:,} rows, {args.database or 'scratch file'}")
+
+    results = {}
+    for name in args.only or BENCHMARKS:
+        results[name] = run(name, BENCHMARKS[name], ctx, args.ops)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            saved = json.load(f)
+        baseline = saved["results"]
+        if saved["meta"].get("rows") != args.rows:
+            print(f"note: baseline was run with --rows {saved['meta'].get('rows')}")
+    regressions = report(results, baseline, args.tolerance)
+
+    if args.save:
+        meta = {
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "rows": args.rows,
+            "ops": args.ops,
+            "database": args.database,
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        }
+        with open(args.save, "w") as f:
+            json.dump({"meta": meta, "results": results}, f, indent=2)
+        print(f"saved {args.save}")
+
+    if regressions:
+        print(f"regressions: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
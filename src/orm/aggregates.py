@@ -0,0 +1,45 @@
+from typing import Optional
+
+
+class Aggregate:
+    """
+    An SQL aggregate over one column, computed by QuerySet.aggregate().
+    The result key defaults to `<field>__<function>`, e.g. "salary__sum".
+    """
+    function = ""
+
+    def __init__(self, field: str, distinct: bool = False):
+        self.field = field
+        self.distinct = distinct
+
+    def default_alias(self) -> str:
+        name = "all" if self.field == "*" else self.field
+        return f"{name}__{self.function.lower()}"
+
+    def sql(self, table: str) -> str:
+        column = "*" if self.field == "*" else f"{table}.{self.field}"
+        distinct = "DISTINCT " if self.distinct else ""
+        return f"{self.function}({distinct}{column})"
+
+
+class Sum(Aggregate):
+    function = "SUM"
+
+
+class Avg(Aggregate):
+    function = "AVG"
+
+
+class Min(Aggregate):
+    function = "MIN"
+
+
+class Max(Aggregate):
+    function = "MAX"
+
+
+class Count(Aggregate):
+    function = "COUNT"
+
+    def __init__(self, field: Optional[str] = "*", distinct: bool = False):
+        super().__init__(field or "*", distinct)
@@ -0,0 +1,415 @@
+"""
+asyncio access to the database.
+The SQL is the one the sync API builds; only the I/O differs. MySQL goes through
+aiomysql, SQLite runs each connection on its own worker thread.
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Optional
+
+from . import cache, connection, instrumentation
+from .backends import Dialect, MySQLBackend, MySQLDialect, SQLiteBackend, mysql_error
+from .connection import _execute, _is_select, invalidate_written
+from .pool import AsyncConnectionPool
+
+_async_backend = None
+_explicit = False
+
+# (connection, depth, backend, tables written) pinned to the current task by aatomic()
+_atomic_state: ContextVar = ContextVar("orm_aatomic", default=None)
+
+
+class AsyncBackend:
+    """
+    asyncio driver: owns an AsyncConnectionPool and runs statements on its connections.
+    `source` is the sync backend it was derived from, if any.
+    """
+    dialect: Dialect = Dialect()
+    source = None
+
+    def __init__(self, **pool_options):
+        self.pool_options: Dict[str, Any] = pool_options
+        self._pool: Optional[AsyncConnectionPool] = None
+        self._loop = None
+
+    @property
+    def pool(self) -> AsyncConnectionPool:
+        loop = asyncio.get_running_loop()
+        # Connections belong to the loop that opened them, a new loop gets a new pool
+        if self._pool is None or self._loop is not loop:
+            self._pool = AsyncConnectionPool(self.connect, ping=self.ping, reset=self.reset,
+                                             close=self.close_connection, **self.pool_options)
+            self._loop = loop
+        return self._pool
+
+    async def close(self) -> None:
+        if self._pool is not None:
+            await self._pool.close_all()
+            self._pool = None
+
+    # ---------- driver hooks ----------
+
+    async def connect(self) -> Any:
+        raise NotImplementedError
+
+    async def ping(self, conn) -> bool:
+        return True
+
+    async def reset(self, conn) -> None:
+        pass
+
+    async def close_connection(self, conn) -> None:
+        pass
+
+    async def begin(self, conn) -> None:
+        raise NotImplementedError
+
+    async def commit(self, conn) -> None:
+        raise NotImplementedError
+
+    async def rollback(self, conn) -> None:
+        raise NotImplementedError
+
+    async def execute(self, conn, sql: str, params=None, return_last_id=False, as_tuples=False):
+        """Run one statement, same results as the sync run_query."""
+        raise NotImplementedError
+
+    async def open_stream(self, conn, sql: str, params=None, as_tuples=False, pinned=False):
+        """Execute a SELECT and return the cursor to fetch() from."""
+        raise NotImplementedError
+
+    async def fetch(self, cursor, size: int):
+        raise NotImplementedError
+
+    async def close_stream(self, cursor, exhausted: bool) -> bool:
+        """Close a stream cursor; returns False when its connection can't be reused."""
+        raise NotImplementedError
+
+
+class AIOMySQLBackend(AsyncBackend):
+    """MySQL through aiomysql, taking the same `config` dict as MySQLBackend."""
+    dialect = MySQLDialect()
+
+    def __init__(self, config: Dict[str, Any], **pool_options):
+        import aiomysql
+
+        super().__init__(**pool_options)
+        self.config = config
+        self._driver = aiomysql
+        self.Error = aiomysql.MySQLError
+
+    async def connect(self):
+        config = self.config
+        return await self._driver.connect(
+            host=config.get("host", "localhost"), port=config.get("port", 3306),
+            user=config.get("user"), password=config.get("password", ""),
+            db=config.get("database"), autocommit=True)
+
+    async def ping(self, conn):
+        await conn.ping(reconnect=False)
+        return True
+
+    async def reset(self, conn):
+        if conn.get_transaction_status():
+            await conn.rollback()
+
+    async def close_connection(self, conn):
+        conn.close()
+
+    async def begin(self, conn):
+        await conn.begin()
+
+    async def commit(self, conn):
+        await conn.commit()
+
+    async def rollback(self, conn):
+        await conn.rollback()
+
+    async def execute(self, conn, sql, params=None, return_last_id=False, as_tuples=False):
+        driver = self._driver
+        cursor = await conn.cursor(driver.Cursor if as_tuples else driver.DictCursor)
+        try:
+            await cursor.execute(sql, params or None)
+            if _is_select(sql):
+                return await cursor.fetchall()
+            if return_last_id:
+                return self.dialect.last_insert_id(cursor)
+            return cursor.rowcount
+        except self.Error as err:
+            raise self.translate_error(err, sql) from err
+        finally:
+            await cursor.close()
+
+    async def open_stream(self, conn, sql, params=None, as_tuples=False, pinned=False):
+        driver = self._driver
+        if pinned:
+            cursor_cls = driver.Cursor if as_tuples else driver.DictCursor
+        else:
+            cursor_cls = driver.SSCursor if as_tuples else driver.SSDictCursor
+        cursor = await conn.cursor(cursor_cls)
+        try:
+            await cursor.execute(sql, params or None)
+        except self.Error as err:
+            await cursor.close()
+            raise self.translate_error(err) from err
+        return cursor
+
+    async def fetch(self, cursor, size):
+        try:
+            return await cursor.fetchmany(size)
+        except self.Error as err:
+            raise self.translate_error(err) from err
+
+    async def close_stream(self, cursor, exhausted):
+        if not exhausted:
+            return False
+        await cursor.close()
+        return True
+
+    def translate_error(self, err, sql=None):
+        errno = err.args[0] if err.args else None
+        msg = err.args[1] if len(err.args) > 1 else str(err)
+        return mysql_error(errno, msg, sql)
+
+
+class _ThreadConnection:
+    """A sync connection plus the single worker thread allowed to touch it."""
+
+    __slots__ = ("raw", "executor")
+
+    def __init__(self, raw, executor):
+        self.raw = raw
+        self.executor = executor
+
+
+def _translated(backend, func, *args):
+    try:
+        return func(*args)
+    except backend.Error as err:
+        raise backend.translate_error(err) from err
+
+
+def _open_cursor(backend, raw, sql, params, as_tuples):
+    cursor = backend.cursor(raw, as_tuples)
+    try:
+        if params:
+            cursor.execute(sql, params)
+        else:
+            cursor.execute(sql)
+    except backend.Error as err:
+        cursor.close()
+        raise backend.translate_error(err) from err
+    return cursor
+
+
+class AsyncSQLiteBackend(AsyncBackend):
+    """
+    SQLite without an async driver: every pooled connection runs on its own worker
+    thread, so the event loop never blocks. Connections come from the wrapped
+    SQLiteBackend, so the sync and async APIs see the same database (scratch ones too).
+    """
+
+    def __init__(self, backend: SQLiteBackend, **pool_options):
+        super().__init__(**(pool_options or backend.pool_options))
+        self.source = backend
+        self.dialect = backend.dialect
+
+    async def _run(self, conn, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(conn.executor, func, *args)
+
+    async def connect(self):
+        executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="orm-sqlite")
+        try:
+            raw = await asyncio.get_running_loop().run_in_executor(executor, self.source.connect)
+        except BaseException:
+            executor.shutdown(wait=False)
+            raise
+        return _ThreadConnection(raw, executor)
+
+    async def ping(self, conn):
+        return await self._run(conn, self.source.ping, conn.raw)
+
+    async def reset(self, conn):
+        await self._run(conn, self.source.reset, conn.raw)
+
+    async def close_connection(self, conn):
+        try:
+            await self._run(conn, conn.raw.close)
+        finally:
+            conn.executor.shutdown(wait=False)
+
+    async def begin(self, conn):
+        await self._run(conn, _translated, self.source, self.source.begin, conn.raw)
+
+    async def commit(self, conn):
+        await self._run(conn, _translated, self.source, self.source.commit, conn.raw)
+
+    async def rollback(self, conn):
+        await self._run(conn, _translated, self.source, self.source.rollback, conn.raw)
+
+    async def execute(self, conn, sql, params=None, return_last_id=False, as_tuples=False):
+        return await self._run(conn, _execute, self.source, conn.raw, sql, params, return_last_id, as_tuples)
+
+    async def open_stream(self, conn, sql, params=None, as_tuples=False, pinned=False):
+        cursor = await self._run(conn, _open_cursor, self.source, conn.raw, sql, params, as_tuples)
+        return conn, cursor
+
+    async def fetch(self, cursor, size):
+        conn, cursor = cursor
+        return await self._run(conn, _translated, self.source, cursor.fetchmany, size)
+
+    async def close_stream(self, cursor, exhausted):
+        conn, cursor = cursor
+        return await self._run(conn, self.source.close_stream, cursor, exhausted)
+
+
+def get_async_backend() -> AsyncBackend:
+    """
+    The asyncio backend. Unless set_async_backend was called it follows the sync one:
+    SQLite is wrapped in AsyncSQLiteBackend, anything else is reached through aiomysql.
+    """
+    global _async_backend
+    source = connection._backend
+    if _async_backend is not None and (_explicit or _async_backend.source is source):
+        return _async_backend
+    if isinstance(source, SQLiteBackend):
+        _async_backend = AsyncSQLiteBackend(source)
+    else:
+        config = source.config if isinstance(source, MySQLBackend) else connection.config
+        _async_backend = AIOMySQLBackend(config, **connection.pool_config)
+        _async_backend.source = source
+    return _async_backend
+
+
+def set_async_backend(backend: Optional[AsyncBackend]) -> Optional[AsyncBackend]:
+    """Route every async query through `backend`; None goes back to following the sync backend."""
+    global _async_backend, _explicit
+    _async_backend = backend
+    _explicit = backend is not None
+    return backend
+
+
+@asynccontextmanager
+async def aatomic():
+    """
+    async counterpart of atomic(): every query of the current task runs on one
+    connection in a single transaction, committed on normal exit, rolled back on error.
+    Nested blocks become savepoints. Tasks started inside the block inherit it,
+    so don't run queries from several of them at once.
+    """
+    state = _atomic_state.get()
+    if state is not None:
+        conn, depth, backend, written = state
+        savepoint = f"orm_sp_{depth}"
+        await backend.execute(conn, f"SAVEPOINT {savepoint}")
+        token = _atomic_state.set((conn, depth + 1, backend, written))
+        try:
+            yield conn
+        except BaseException:
+            _atomic_state.reset(token)
+            await backend.execute(conn, f"ROLLBACK TO SAVEPOINT {savepoint}")
+            await backend.execute(conn, f"RELEASE SAVEPOINT {savepoint}")
+            raise
+        _atomic_state.reset(token)
+        await backend.execute(conn, f"RELEASE SAVEPOINT {savepoint}")
+        return
+
+    backend = get_async_backend()
+    pool = backend.pool
+    conn = await pool.acquire()
+    try:
+        await backend.begin(conn)
+    except BaseException:
+        await pool.release(conn, discard=True)
+        raise
+    written = set()
+    token = _atomic_state.set((conn, 1, backend, written))
+    try:
+        yield conn
+    except BaseException:
+        _atomic_state.reset(token)
+        try:
+            await backend.rollback(conn)
+        except BaseException:
+            await pool.release(conn, discard=True)
+            raise
+        await pool.release(conn)
+        raise
+    _atomic_state.reset(token)
+    try:
+        await backend.commit(conn)
+    except BaseException:
+        await pool.release(conn, discard=True)
+        raise
+    await pool.release(conn)
+    cache.invalidate(*written)
+
+
+async def arun_query(sql: str, params=None, return_last_id=False, as_tuples=False):
+    """async run_query: same arguments and results, on a connection of the async pool."""
+    if not instrumentation.active():
+        result = await _arun_query(sql, params, return_last_id, as_tuples)
+    else:
+        event = instrumentation.start(sql, params)
+        try:
+            result = await _arun_query(sql, params, return_last_id, as_tuples)
+        except BaseException as err:
+            instrumentation.finish(event, error=err)
+            raise
+        instrumentation.finish(event, instrumentation.rowcount_of(result, return_last_id))
+    if not _is_select(sql):
+        state = _atomic_state.get()
+        invalidate_written(sql, state[3] if state is not None else None)
+    return result
+
+
+async def _arun_query(sql, params, return_last_id, as_tuples):
+    state = _atomic_state.get()
+    if state is not None:
+        conn, _, backend, _ = state
+        return await backend.execute(conn, sql, params, return_last_id, as_tuples)
+    backend = get_async_backend()
+    async with backend.pool.connection() as conn:
+        return await backend.execute(conn, sql, params, return_last_id, as_tuples)
+
+
+async def astream_query(sql: str, params=None, chunk_size: int = 1000, as_tuples: bool = False):
+    """
+    async stream_query: yields the rows of a SELECT in lists of up to `chunk_size`.
+    The connection goes back to the pool when the generator is exhausted or closed.
+    """
+    event = instrumentation.start(sql, params) if instrumentation.active() else None
+    fetched = 0
+    error = None
+    state = _atomic_state.get()
+    if state is not None:
+        conn, _, backend, _ = state
+        pool = None
+    else:
+        backend = get_async_backend()
+        pool = backend.pool
+        conn = await pool.acquire()
+    cursor = None
+    exhausted = False
+    try:
+        cursor = await backend.open_stream(conn, sql, params, as_tuples, pinned=pool is None)
+        rows = await backend.fetch(cursor, chunk_size)
+        while rows:
+            fetched += len(rows)
+            yield rows
+            rows = await backend.fetch(cursor, chunk_size)
+        exhausted = True
+    except Exception as err:
+        error = err
+        raise
+    finally:
+        try:
+            reusable = cursor is not None and await backend.close_stream(cursor, exhausted)
+        except Exception:
+            reusable = False
+        if pool is not None:
+            await pool.release(conn, discard=not reusable)
+        if event is not None:
+            instrumentation.finish(event, fetched, error)
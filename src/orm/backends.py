@@ -0,0 +1,346 @@
+import os
+import re
+import sqlite3
+import tempfile
+from typing import Any, Dict, List, Optional
+
+from .pool import ConnectionPool
+
+
+class UniqueViolation(ValueError):
+    """
+    A write hit a UNIQUE (or primary key) constraint.
+    `field` is the column named by the constraint, `value` the duplicate when the server reports it.
+    """
+
+    def __init__(self, field: Optional[str], value: Any = None, table: Optional[str] = None,
+                 message: Optional[str] = None):
+        self.field = field
+        self.value = value
+        self.table = table
+        if message is None:
+            message = f"Unique constraint violation: {field}={value!r} already exists"
+        super().__init__(message)
+
+
+class Dialect:
+    """
+    The SQL flavour of a database.
+    Model and QuerySet ask the dialect for anything that differs between servers.
+    """
+    name = "generic"
+    placeholder = "%s"
+    auto_increment: Optional[str] = "AUTO_INCREMENT"
+    # Most bound parameters one statement may carry
+    max_params = 65535
+    # LIMIT value meaning "no limit", needed when only an OFFSET is given
+    no_limit = "18446744073709551615"
+    # MySQL takes INDEX clauses inside CREATE TABLE and prefix lengths on text columns
+    inline_indexes = True
+    index_prefixes = True
+
+    def placeholders(self, count: int) -> str:
+        return ", ".join([self.placeholder] * count)
+
+    def limit_sql(self, limit: Optional[int], offset: int = 0) -> str:
+        """` LIMIT n OFFSET m` clause, empty when neither is set."""
+        if limit is None and not offset:
+            return ""
+        sql = f" LIMIT {self.no_limit if limit is None else int(limit)}"
+        if offset:
+            sql += f" OFFSET {int(offset)}"
+        return sql
+
+    def index_columns(self, columns) -> str:
+        """`a, b(10)` for (name, prefix length or None) pairs."""
+        return ", ".join(f"{name}({prefix})" if prefix and self.index_prefixes else name
+                         for name, prefix in columns)
+
+    def index_names_sql(self, table: str):
+        """SELECT of the index names that exist on `table`, with its parameters."""
+        return ("SELECT DISTINCT INDEX_NAME FROM information_schema.STATISTICS "
+                f"WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = {self.placeholder}", (table,))
+
+    def upsert_sql(self, conflict_fields, update_fields) -> str:
+        """
+        Clause appended to an INSERT to update the existing row instead on a duplicate.
+        MySQL takes any unique key as the conflict, `conflict_fields` is for other servers.
+        The inserted row is read through a row alias (MySQL 8.0.19+): VALUES(col) is
+        deprecated since 8.0.20 and its warning is an error under raise_on_warnings.
+        """
+        if not update_fields:
+            # A no-op assignment: the duplicate row is kept as it is
+            column = conflict_fields[0]
+            return f" AS new ON DUPLICATE KEY UPDATE {column} = {column}"
+        return " AS new ON DUPLICATE KEY UPDATE " + ", ".join(f"{name} = new.{name}" for name in update_fields)
+
+    def last_insert_id(self, cursor) -> Any:
+        return cursor.lastrowid
+
+    def inserted_ids(self, last_id: Any, count: int) -> List[Any]:
+        """
+        Primary keys generated by a multi-row INSERT of `count` rows.
+        MySQL reports the id of the first row; with innodb_autoinc_lock_mode 0 or 1
+        (or no concurrent inserts) the rest follow consecutively.
+        """
+        return list(range(last_id, last_id + count))
+
+
+class MySQLDialect(Dialect):
+    name = "mysql"
+
+
+class SQLiteDialect(Dialect):
+    name = "sqlite"
+    placeholder = "?"
+    # INTEGER PRIMARY KEY already aliases the rowid and is assigned automatically
+    auto_increment = None
+    max_params = 32766 if sqlite3.sqlite_version_info >= (3, 32, 0) else 999
+    no_limit = "-1"
+    inline_indexes = False
+    # No prefix indexes, the whole column is indexed
+    index_prefixes = False
+
+    def index_names_sql(self, table):
+        return "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = ?", (table,)
+
+    def upsert_sql(self, conflict_fields, update_fields):
+        # UPSERT needs SQLite 3.24+
+        target = ", ".join(conflict_fields)
+        if not update_fields:
+            return f" ON CONFLICT ({target}) DO NOTHING"
+        return f" ON CONFLICT ({target}) DO UPDATE SET " + ", ".join(
+            f"{name} = excluded.{name}" for name in update_fields)
+
+    def inserted_ids(self, last_id, count):
+        # SQLite reports the rowid of the last row, the writer lock keeps them consecutive
+        return list(range(last_id - count + 1, last_id + 1))
+
+
+class Backend:
+    """
+    A database driver: owns the connection pool and knows how to open,
+    check and reset connections for one kind of server.
+    """
+    dialect: Dialect = Dialect()
+    Error: Any = Exception
+
+    def __init__(self, **pool_options):
+        self.pool_options: Dict[str, Any] = pool_options
+        self._pool: Optional[ConnectionPool] = None
+
+    @property
+    def pool(self) -> ConnectionPool:
+        if self._pool is None:
+            self._pool = ConnectionPool(self.connect, ping=self.ping, reset=self.reset,
+                                        **self.pool_options)
+        return self._pool
+
+    def configure_pool(self, **options) -> ConnectionPool:
+        """Change pool settings and rebuild the pool."""
+        self.pool_options.update(options)
+        self.close()
+        return self.pool
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.close_all()
+            self._pool = None
+
+    # ---------- driver hooks ----------
+
+    def connect(self) -> Any:
+        raise NotImplementedError
+
+    def ping(self, conn) -> bool:
+        return True
+
+    def reset(self, conn) -> None:
+        if conn.in_transaction:
+            conn.rollback()
+
+    def begin(self, conn) -> None:
+        conn.start_transaction()
+
+    def commit(self, conn) -> None:
+        conn.commit()
+
+    def rollback(self, conn) -> None:
+        conn.rollback()
+
+    def cursor(self, conn, as_tuples: bool = False):
+        """A cursor whose rows are dicts keyed by column name, or plain tuples with `as_tuples`."""
+        raise NotImplementedError
+
+    def stream_cursor(self, conn, as_tuples: bool = False):
+        """Like cursor() but leaves rows on the server until they are fetched."""
+        return self.cursor(conn, as_tuples)
+
+    def buffered_cursor(self, conn, as_tuples: bool = False):
+        """Like cursor() but reads every row at once, so the connection is free for other queries."""
+        return self.cursor(conn, as_tuples)
+
+    def close_stream(self, cursor, exhausted: bool) -> bool:
+        """Close a stream cursor; returns False when its connection can't be reused."""
+        cursor.close()
+        return True
+
+    def translate_error(self, err: Exception, sql: Optional[str] = None) -> Exception:
+        """The exception to raise for a driver error; `sql` is the statement that failed, when known."""
+        return RuntimeError(str(err))
+
+
+# MySQL server error numbers (mysql.connector.errorcode / pymysql.constants.ER)
+ER_ACCESS_DENIED_ERROR = 1045
+ER_BAD_DB_ERROR = 1049
+ER_DUP_ENTRY = 1062
+
+# Duplicate entry '0915' for key 'employee.phonenum' (MySQL 8) / for key 'phonenum' (5.7)
+_dup_entry = re.compile(r"Duplicate entry '(?P<value>.*)' for key '(?:(?P<table>[^.']+)\.)?(?P<key>[^']+)'")
+
+
+def mysql_error(errno: int, msg: Optional[str], sql: Optional[str] = None) -> Exception:
+    """
+    The exception to raise for a MySQL server error, whichever driver reported it.
+    `sql` supplies the table when the server leaves it out of the message (before 8.0.19).
+    """
+    if errno == ER_DUP_ENTRY:
+        match = _dup_entry.search(msg or "")
+        if match:
+            table = match.group("table")
+            if table is None and sql is not None:
+                from .instrumentation import statement_table
+                table = statement_table(sql)
+            # Single column UNIQUE keys are named after their column, the primary key
+            # after the model's primary key field like SQLite reports it
+            key = match.group("key")
+            field = key
+            if key == "PRIMARY":
+                from .metaclass import ModelMeta
+                model = ModelMeta.registry.get(table.lower()) if table else None
+                field = model._pk_name if model is not None else None
+            return UniqueViolation(field, match.group("value"), table, msg)
+        return UniqueViolation(None, message=msg)
+    if errno == ER_ACCESS_DENIED_ERROR:
+        message = "Invalid credentials"
+    elif errno == ER_BAD_DB_ERROR:
+        message = "Database does not exist"
+    else:
+        message = f"MySQL error [{errno}]: {msg}"
+    return RuntimeError(message)
+
+
+class MySQLBackend(Backend):
+    dialect = MySQLDialect()
+
+    def __init__(self, config: Dict[str, Any], **pool_options):
+        import mysql.connector
+
+        super().__init__(**pool_options)
+        self.config = config
+        self._driver = mysql.connector
+        self.Error = mysql.connector.Error
+
+    def connect(self):
+        conn = self._driver.connect(**self.config)
+        # Every statement is its own transaction, so a pooled connection never
+        # keeps an old snapshot open between checkouts.
+        conn.autocommit = True
+        return conn
+
+    def ping(self, conn) -> bool:
+        return conn.is_connected()
+
+    def cursor(self, conn, as_tuples=False):
+        return conn.cursor(dictionary=not as_tuples)
+
+    def stream_cursor(self, conn, as_tuples=False):
+        return conn.cursor(dictionary=not as_tuples, buffered=False)
+
+    def buffered_cursor(self, conn, as_tuples=False):
+        return conn.cursor(dictionary=not as_tuples, buffered=True)
+
+    def close_stream(self, cursor, exhausted):
+        if not exhausted:
+            # Unread rows would have to be drained first, dropping the connection is cheaper
+            return False
+        cursor.close()
+        return True
+
+    def translate_error(self, err, sql=None):
+        return mysql_error(err.errno, err.msg, sql)
+
+
+def _dict_row(cursor, row):
+    return {col[0]: value for col, value in zip(cursor.description, row)}
+
+
+class SQLiteBackend(Backend):
+    """
+    In-process SQLite driver.
+    Without a `database` file it opens a private scratch database, a temporary WAL
+    file that every pooled connection of this backend shares and that is removed
+    with the backend. Writers wait up to `busy_timeout` seconds for each other's
+    transactions.
+    """
+    dialect = SQLiteDialect()
+    Error = sqlite3.Error
+
+    def __init__(self, database: Optional[str] = None, busy_timeout: float = 30.0, **pool_options):
+        if database == ":memory:":
+            # Each connection would get its own empty database, and sharing one through
+            # shared cache lets readers see uncommitted writes and fails writers on table locks
+            raise ValueError("Pooled connections can't share a ':memory:' database; "
+                             "leave out `database` for a private scratch database")
+        super().__init__(**pool_options)
+        self.database = database
+        self.busy_timeout = busy_timeout
+        self._scratch = None
+        if database is None:
+            self._scratch = tempfile.TemporaryDirectory(prefix="orm_sqlite_")
+            self._path = os.path.join(self._scratch.name, "scratch.db")
+            conn = self.connect()
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.close()
+        else:
+            self._path = database
+
+    def connect(self):
+        conn = sqlite3.connect(self._path, timeout=self.busy_timeout, isolation_level=None,
+                               check_same_thread=False)
+        if self._scratch is not None:
+            # Scratch data doesn't need to survive a power loss
+            conn.execute("PRAGMA synchronous = OFF")
+        return conn
+
+    def ping(self, conn) -> bool:
+        try:
+            conn.execute("SELECT 1")
+        except sqlite3.Error:
+            return False
+        return True
+
+    def cursor(self, conn, as_tuples=False):
+        cursor = conn.cursor()
+        if not as_tuples:
+            cursor.row_factory = _dict_row
+        return cursor
+
+    def begin(self, conn):
+        # Take the write lock up front: a deferred transaction that reads and then writes
+        # fails with SQLITE_BUSY when another writer got in between, without waiting
+        conn.execute("BEGIN IMMEDIATE")
+
+    def commit(self, conn):
+        conn.execute("COMMIT")
+
+    def rollback(self, conn):
+        conn.execute("ROLLBACK")
+
+    def translate_error(self, err, sql=None):
+        message = str(err)
+        if isinstance(err, sqlite3.IntegrityError) and message.startswith("UNIQUE constraint failed: "):
+            # "UNIQUE constraint failed: employee.phonenum[, employee.other]"
+            table, _, field = message.split(": ", 1)[1].split(", ")[0].partition(".")
+            return UniqueViolation(field, table=table, message=message)
+        return RuntimeError(f"SQLite error: {err}")
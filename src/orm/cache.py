@@ -0,0 +1,140 @@
+"""
+Opt-in cache of query results, keyed by (SQL, params).
+Writes issued through the ORM invalidate every entry that read the written table.
+The in-process LocalCache is the default store; set_cache() plugs in another one.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+# Returned by CacheBackend.get() for a key it doesn't hold
+MISSING = object()
+
+
+class CacheBackend:
+    """
+    Interface of a result store. Keys are (sql, params, as_tuples, database) tuples, a shared
+    store would hash them; values are the row lists run_query returned.
+    Each table has a version that invalidate() bumps; set() drops a value computed
+    against an older version, so a result read while a write happened is not stored.
+    """
+
+    def version(self, tables: Tuple[str, ...]) -> Any:
+        raise NotImplementedError
+
+    def get(self, key) -> Any:
+        raise NotImplementedError
+
+    def set(self, key, value, ttl: float, tables: Tuple[str, ...], version: Any) -> None:
+        raise NotImplementedError
+
+    def invalidate(self, tables: Iterable[str]) -> None:
+        raise NotImplementedError
+
+    def clear(self) -> None:
+        raise NotImplementedError
+
+
+class LocalCache(CacheBackend):
+    """Thread-safe in-process store: LRU beyond `max_size` entries, expiry by TTL."""
+
+    def __init__(self, max_size: int = 1024):
+        if max_size < 1:
+            raise ValueError("max_size must be at least 1")
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Any, tuple]" = OrderedDict()  # key -> (expires, value, tables)
+        self._by_table: Dict[str, set] = {}
+        self._versions: Dict[str, int] = {}
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "expired": 0, "invalidations": 0}
+
+    def version(self, tables):
+        with self._lock:
+            return tuple(self._versions.get(table, 0) for table in tables)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._stats["misses"] += 1
+                return MISSING
+            if entry[0] <= time.monotonic():
+                self._remove(key)
+                self._stats["expired"] += 1
+                self._stats["misses"] += 1
+                return MISSING
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            return entry[1]
+
+    def set(self, key, value, ttl, tables, version):
+        with self._lock:
+            if version != tuple(self._versions.get(table, 0) for table in tables):
+                return
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic() + ttl, value, tables)
+            for table in tables:
+                self._by_table.setdefault(table, set()).add(key)
+            if len(self._entries) > self.max_size:
+                self._remove(next(iter(self._entries)))
+                self._stats["evictions"] += 1
+
+    def invalidate(self, tables):
+        with self._lock:
+            for table in tables:
+                self._versions[table] = self._versions.get(table, 0) + 1
+                keys = self._by_table.pop(table, None)
+                if keys:
+                    self._stats["invalidations"] += len(keys)
+                    for key in keys:
+                        self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_table.clear()
+            # Bump every version so results being computed right now aren't stored
+            for table in self._versions:
+                self._versions[table] += 1
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["size"] = len(self._entries)
+        return stats
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for table in entry[2]:
+            keys = self._by_table.get(table)
+            if keys is not None:
+                keys.discard(key)
+
+
+_cache: Optional[CacheBackend] = LocalCache()
+
+
+def get_cache() -> Optional[CacheBackend]:
+    return _cache
+
+
+def set_cache(backend: Optional[CacheBackend]) -> Optional[CacheBackend]:
+    """Use `backend` as the result store; None turns result caching off everywhere."""
+    global _cache
+    _cache = backend
+    return backend
+
+
+def invalidate(*tables: str) -> None:
+    """Drop the cached results of `tables`, e.g. after writing them with raw SQL elsewhere."""
+    if _cache is not None and tables:
+        _cache.invalidate(tables)
+
+
+def clear() -> None:
+    if _cache is not None:
+        _cache.clear()
@@ -1,5 +1,11 @@
-import mysql.connector
-from mysql.connector import errorcode
+import threading
+from contextlib import ContextDecorator, contextmanager
+from contextvars import ContextVar
+
+from . import cache, instrumentation
+from .backends import Backend, MySQLBackend, SQLiteBackend
+from .pool import ConnectionPool
+from .router import Router
 
 # Authentication info
 config = {
@@ -11,48 +17,434 @@ config = {
     "raise_on_warnings": True,
 }
 
+# Pool settings, see ConnectionPool for the meaning of each key
+pool_config = {
+    "size": 5,
+    "timeout": 30.0,
+    "recycle": 3600,
+    "ping_after": 30.0,
+}
+
+_backend = None
+_router = None
+
+# Connection pinned to the current thread by atomic()
+_local = threading.local()
+
+# Database chosen with using() for the current thread / task
+_database: ContextVar = ContextVar("orm_database", default=None)
+
+# Set while the rows of a stream_query() are turned into objects, see streaming()
+_streaming: ContextVar = ContextVar("orm_streaming", default=False)
+
 
-def run_query(sql: str, params=None, return_last_id=False):
+def get_backend() -> Backend:
+    """The active database backend, MySQL with `config` unless set_backend was called."""
+    global _backend
+    if _backend is None:
+        _backend = MySQLBackend(config, **pool_config)
+    return _backend
+
+
+def set_backend(backend: Backend) -> Backend:
+    """Route every query through `backend`, closing the previous one's pool."""
+    global _backend, _router
+    if _router is not None:
+        for other in _router.databases.values():
+            if other is not backend:
+                other.close()
+        _router = None
+        cache.clear()
+    if _backend is not None and _backend is not backend:
+        _backend.close()
+        # Cached results came from the previous database
+        cache.clear()
+    _backend = backend
+    return backend
+
+
+def set_router(router: Router) -> Router:
     """
-    Execute the given SQL statement.
-    Give it you'r SQL statement and it will execute it in mysql server that is running on your machine.
+    Spread queries over several databases: writes and atomic() blocks go to the
+    router's primary (which get_backend() returns from now on), SELECTs to its replicas.
     """
-    conn = None
-    cursor = None
+    global _backend, _router
+    previous = list(_router.databases.values()) if _router is not None else [_backend]
+    for other in previous:
+        if other is not None and other not in router.databases.values():
+            other.close()
+    cache.clear()
+    _router = router
+    _backend = router.primary
+    return router
+
+
+def use_router(databases: dict, primary: str = "primary", replicas=None,
+               strategy: str = "round_robin") -> Router:
+    """
+    set_router() for named databases given as Backends or MySQL config dicts, e.g.
+    use_router({"primary": config, "replica1": replica_config}, strategy="least_busy").
+    """
+    backends = {name: db if isinstance(db, Backend) else MySQLBackend(db, **pool_config)
+                for name, db in databases.items()}
+    return set_router(Router(backends, primary, replicas, strategy))
+
+
+def get_router():
+    """The active Router, None with a single database."""
+    return _router
+
+
+def primary_database() -> str:
+    """Name of the database writes go to, for reads that must not hit a replica."""
+    return _router.primary_name if _router is not None else "default"
+
+
+def get_database(name: str) -> Backend:
+    """The backend of a named database; without a router the only one is "default" (or "primary")."""
+    if _router is not None:
+        return _router.get(name)
+    if name in ("default", "primary"):
+        return get_backend()
+    raise ValueError(f"Unknown database '{name}', no router is configured")
+
+
+@contextmanager
+def using(name: str):
+    """
+    Run the queries of this block on database `name`, e.g. `with using("primary"):`
+    to read rows just written before they reach the replicas. atomic() blocks always
+    stay on their own connection.
+    """
+    get_database(name)
+    token = _database.set(name)
+    try:
+        yield
+    finally:
+        _database.reset(token)
+
+
+@contextmanager
+def streaming():
+    """
+    Mark queries made while consuming a stream_query() (e.g. loading ForeignKeys of a
+    chunk): when streams hold every pooled connection they fail at once with PoolTimeout
+    instead of waiting for a connection that can't come back.
+    """
+    token = _streaming.set(True)
     try:
-        conn = mysql.connector.connect(**config)
-        cursor = conn.cursor(dictionary=True)
+        yield
+    finally:
+        _streaming.reset(token)
+
+
+def current_database():
+    """The database named by the innermost using() block, None outside one."""
+    return _database.get()
+
+
+def _backend_for(sql: str, using: str = None) -> Backend:
+    """The backend a statement runs on outside atomic(): using() first, then replica or primary."""
+    name = using or _database.get()
+    if name is not None:
+        return get_database(name)
+    if _router is not None and _is_select(sql):
+        return _router.read_backend()
+    return get_backend()
+
+
+def use_sqlite(database: str = None, **pool_options) -> SQLiteBackend:
+    """Shortcut for set_backend(SQLiteBackend(...)), a private scratch database by default."""
+    options = dict(pool_config, **pool_options)
+    return set_backend(SQLiteBackend(database, **options))
+
+
+def get_pool() -> ConnectionPool:
+    """The connection pool of the active backend, created on first use."""
+    return get_backend().pool
+
+
+def configure_pool(**options) -> ConnectionPool:
+    """Change pool settings (size, timeout, recycle, ping_after) and rebuild the pool."""
+    unknown = set(options) - set(pool_config)
+    if unknown:
+        raise ValueError(f"Unknown pool option(s): {', '.join(sorted(unknown))}")
+    pool_config.update(options)
+    return get_backend().configure_pool(**options)
+
+
+def pool_stats() -> dict:
+    """Counters of the shared pool (checkouts, waits, created, ...)."""
+    return get_pool().stats()
+
+
+class Atomic(ContextDecorator):
+    """
+    Transaction block, see atomic().
+    Per-block state lives on a thread-local stack so one instance can be
+    reused as a decorator across threads and recursive calls.
+    """
+
+    def __init__(self, batch_saves: bool = False):
+        self.batch_saves = batch_saves
 
+    def __enter__(self):
+        backend = get_backend()
+        stack = _local.__dict__.setdefault("stack", [])
+        pool = None
+        if getattr(_local, "conn", None) is None:
+            # Released to this pool even if configure_pool() replaces it meanwhile
+            pool = backend.pool
+            conn = pool.acquire()
+            try:
+                backend.begin(conn)
+            except BaseException:
+                pool.release(conn, discard=True)
+                raise
+            _local.conn = conn
+            # Tables written by the transaction, their cached results are dropped again on commit
+            _local.written = set()
+            savepoint = None
+        else:
+            savepoint = f"orm_sp_{len(stack)}"
+            run_query(f"SAVEPOINT {savepoint}")
+        # [savepoint, queued saves, backend, pool of the outermost block]
+        stack.append([savepoint, {} if self.batch_saves else None, backend, pool])
+        return _local.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        frame = _local.stack[-1]
+        queue = frame[1]
+        if exc_type is None and queue:
+            frame[1] = None
+            try:
+                _flush_saves(queue.values())
+            except BaseException:
+                self._finish(commit=False)
+                raise
+        self._finish(commit=exc_type is None)
+        return False
+
+    def _finish(self, commit: bool):
+        savepoint, _, backend, pool = _local.stack.pop()
+        if savepoint is not None:
+            if not commit:
+                run_query(f"ROLLBACK TO SAVEPOINT {savepoint}")
+            run_query(f"RELEASE SAVEPOINT {savepoint}")
+            return
+
+        conn, _local.conn = _local.conn, None
+        written, _local.written = _local.written, None
+        try:
+            if commit:
+                backend.commit(conn)
+            else:
+                backend.rollback(conn)
+        except BaseException:
+            pool.release(conn, discard=True)
+            raise
+        pool.release(conn)
+        if commit:
+            # Readers outside the transaction may have cached the old rows meanwhile
+            cache.invalidate(*written)
+
+
+def atomic(func=None, *, batch_saves: bool = False):
+    """
+    Run every query of this thread on one connection inside a single transaction.
+    Commits when the block exits normally, rolls back on error.
+    Nested blocks become savepoints, so an inner failure only undoes the inner block.
+
+    Works as `with atomic():`, `@atomic` and `@atomic(batch_saves=True)`.
+    With `batch_saves`, Model.save() calls directly inside the block are queued and
+    flushed on exit as multi-row INSERTs and executemany UPDATEs, grouped by model
+    in the order the models were first saved. Queued objects get their primary key
+    only at flush time.
+    """
+    if callable(func):
+        return Atomic()(func)
+    return Atomic(batch_saves=batch_saves)
+
+
+def queue_save(obj) -> bool:
+    """Queue `obj` on the innermost atomic(batch_saves=True) block; False when there is none."""
+    stack = getattr(_local, "stack", None)
+    if not stack or stack[-1][1] is None:
+        return False
+    stack[-1][1][id(obj)] = obj
+    return True
+
+
+def _flush_saves(objs):
+    groups = {}
+    for obj in objs:
+        groups.setdefault(type(obj), []).append(obj)
+    for model_cls, batch in groups.items():
+        model_cls._save_batch(batch)
+
+
+def _execute(backend, conn, sql, params, return_last_id, as_tuples=False):
+    cursor = backend.cursor(conn, as_tuples)
+    try:
         if params:
             cursor.execute(sql, params)
         else:
             cursor.execute(sql)
 
-        if sql.strip().lower().startswith("select"):
+        if _is_select(sql):
             return cursor.fetchall()
         else:
-            conn.commit()
             if return_last_id:
-                return cursor.lastrowid
+                return backend.dialect.last_insert_id(cursor)
             else:
                 return cursor.rowcount
 
-    except mysql.connector.Error as err:
-        if err.errno == errorcode.ER_ACCESS_DENIED_ERROR:
-            msg = "Invalid credentials"
-        elif err.errno == errorcode.ER_BAD_DB_ERROR:
-            msg = "Database does not exist"
-        else:
-            msg = f"MySQL error [{err.errno}]: {err.msg}"
-        raise RuntimeError(msg)
+    except backend.Error as err:
+        raise backend.translate_error(err, sql) from err
 
     finally:
-        if cursor is not None:
-            cursor.close()
-        if conn is not None and conn.is_connected():
-            conn.close()
+        cursor.close()
+
+
+def in_atomic() -> bool:
+    """Whether this thread is inside an atomic() block."""
+    return getattr(_local, "conn", None) is not None
+
+
+def _is_select(sql: str) -> bool:
+    return sql.lstrip()[:6].lower() == "select"
+
+
+def invalidate_written(sql: str, written=None) -> None:
+    """Drop the cached results of the table a write statement touched."""
+    table = instrumentation.statement_table(sql)
+    if table is None:
+        return
+    if written is not None:
+        written.add(table)
+    cache.invalidate(table)
+
+
+def run_many(sql: str, seq_params, using: str = None) -> int:
+    """Execute one statement once per parameter tuple (executemany); returns the rows affected."""
+    if instrumentation.active():
+        result = _observed(_run_many, False, sql, seq_params, using)
+    else:
+        result = _run_many(sql, seq_params, using)
+    invalidate_written(sql, getattr(_local, "written", None))
+    return result
 
 
+def _run_many(sql, seq_params, using=None):
+    conn = getattr(_local, "conn", None)
+    if conn is not None:
+        return _execute_many(get_backend(), conn, sql, seq_params)
+    backend = _backend_for(sql, using)
+    with backend.pool.connection(nested=_streaming.get()) as conn:
+        return _execute_many(backend, conn, sql, seq_params)
+
+
+def _execute_many(backend, conn, sql, seq_params):
+    cursor = backend.cursor(conn)
+    try:
+        cursor.executemany(sql, seq_params)
+        return cursor.rowcount
+    except backend.Error as err:
+        raise backend.translate_error(err, sql) from err
+    finally:
+        cursor.close()
+
+
+def run_query(sql: str, params=None, return_last_id=False, as_tuples=False, using: str = None):
+    """
+    Execute the given SQL statement.
+    Give it you'r SQL statement and it will execute it on the active backend (MySQL by default).
+    The connection is borrowed from the backend's pool (or the one pinned by atomic()).
+    SELECT rows are dicts, or tuples in column order with `as_tuples`.
+    With a router SELECTs go to a replica; `using` names the database explicitly.
+    """
+    if instrumentation.active():
+        result = _observed(_run_query, return_last_id, sql, params, return_last_id, as_tuples, using)
+    else:
+        result = _run_query(sql, params, return_last_id, as_tuples, using)
+    if not _is_select(sql):
+        invalidate_written(sql, getattr(_local, "written", None))
+    return result
+
+
+def _run_query(sql, params=None, return_last_id=False, as_tuples=False, using=None):
+    conn = getattr(_local, "conn", None)
+    if conn is not None:
+        return _execute(get_backend(), conn, sql, params, return_last_id, as_tuples)
+    backend = _backend_for(sql, using)
+    with backend.pool.connection(nested=_streaming.get()) as conn:
+        return _execute(backend, conn, sql, params, return_last_id, as_tuples)
+
+
+def _observed(run, return_last_id, sql, params, *args):
+    """Run a statement between the instrumentation hooks."""
+    event = instrumentation.start(sql, params)
+    try:
+        result = run(sql, params, *args)
+    except BaseException as err:
+        instrumentation.finish(event, error=err)
+        raise
+    instrumentation.finish(event, instrumentation.rowcount_of(result, return_last_id))
+    return result
+
+
+def stream_query(sql: str, params=None, chunk_size: int = 1000, as_tuples: bool = False,
+                 using: str = None):
+    """
+    Execute a SELECT and yield its rows in lists of up to `chunk_size`.
+    Rows stay on the server (unbuffered cursor) until fetched, so memory is bounded by one chunk.
+    The connection goes back to the pool when the generator is exhausted or closed.
+    Inside atomic() the pinned connection is used with a buffered cursor: queries run
+    between chunks (ForeignKeys, prefetch_related) need that connection too.
+    """
+    event = instrumentation.start(sql, params) if instrumentation.active() else None
+    fetched = 0
+    error = None
+    pinned = getattr(_local, "conn", None)
+    backend = get_backend() if pinned is not None else _backend_for(sql, using)
+    # Released to the pool it came from even if configure_pool() replaces it meanwhile
+    pool = backend.pool
+    conn = pinned if pinned is not None else pool.acquire(stream=True, nested=_streaming.get())
+    cursor = None
+    exhausted = False
+    try:
+        if pinned is not None:
+            cursor = backend.buffered_cursor(conn, as_tuples)
+        else:
+            cursor = backend.stream_cursor(conn, as_tuples)
+        try:
+            if params:
+                cursor.execute(sql, params)
+            else:
+                cursor.execute(sql)
+            rows = cursor.fetchmany(chunk_size)
+            while rows:
+                fetched += len(rows)
+                yield rows
+                rows = cursor.fetchmany(chunk_size)
+        except backend.Error as err:
+            error = backend.translate_error(err)
+            raise error from err
+        exhausted = True
+    finally:
+        if pinned is not None:
+            if cursor is not None:
+                cursor.close()
+        else:
+            try:
+                reusable = cursor is not None and backend.close_stream(cursor, exhausted)
+            except backend.Error:
+                reusable = False
+            pool.release(conn, discard=not reusable)
+        if event is not None:
+            # One event for the whole stream, counting the rows actually fetched
+            instrumentation.finish(event, fetched, error)
+
 if __name__ == "__main__":
     try:
         # Example SELECT
@@ -5,14 +5,16 @@ class Field:
     """
     Base class for all model fields.
     Holds metadata about the column type and optional constraints.
+    `index=True` gives the column its own (non-unique) index.
     """
     def __init__(self, column_type: str, primary_key: bool = False, nullable: bool = True, 
-                 default: Any = None, unique: bool = False):
+                 default: Any = None, unique: bool = False, index: bool = False):
         self.column_type = column_type
         self.primary_key = primary_key
         self.nullable = nullable
         self.default = default
         self.unique = unique
+        self.index = index
         self.name: Optional[str] = None  # set by the metaclass
 
     def _format_default(self) -> str:
@@ -24,15 +26,18 @@ class Field:
             return 'NULL'
         return str(self.default)
 
-    def ddl(self, include_auto_increment: bool = False) -> str:
+    def ddl(self, include_auto_increment: bool = False, dialect: Any = None) -> str:
         """
         DDL snippet for field.
+        `dialect` decides the auto increment keyword (MySQL's when not given).
         """
         parts = [self.column_type]
-        
+        auto_increment = "AUTO_INCREMENT" if dialect is None else dialect.auto_increment
+
         # AUTO_INCREMENT should come first for MySQL compatibility
-        if include_auto_increment and self.primary_key and self.column_type.upper() == "INTEGER":
-            parts.append("AUTO_INCREMENT")
+        if include_auto_increment and auto_increment and self.primary_key \
+                and self.column_type.upper() == "INTEGER":
+            parts.append(auto_increment)
         
         if self.primary_key:
             parts.append("PRIMARY KEY")
@@ -47,48 +52,55 @@ class Field:
 
 class IntegerField(Field):
     def __init__(self, primary_key: bool = False, nullable: bool = True, 
-                 default: Optional[int] = None, unique: bool = False):
+                 default: Optional[int] = None, unique: bool = False,
+                 index: bool = False):
         super().__init__(column_type="INTEGER", primary_key=primary_key, 
-                         nullable=nullable, default=default, unique=unique)
+                         nullable=nullable, default=default, unique=unique, index=index)
 
 
 class StringField(Field):
     def __init__(self, max_length: int = 255, primary_key: bool = False, 
-                 nullable: bool = True, default: Optional[str] = None, unique: bool = False):
+                 nullable: bool = True, default: Optional[str] = None, unique: bool = False,
+                 index: bool = False):
         super().__init__(column_type=f"VARCHAR({max_length})", primary_key=primary_key, 
-                         nullable=nullable, default=default, unique=unique)
+                         nullable=nullable, default=default, unique=unique, index=index)
 
 
 class FloatField(Field):
     def __init__(self, primary_key: bool = False, nullable: bool = True, 
-                 default: Optional[float] = None, unique: bool = False):
+                 default: Optional[float] = None, unique: bool = False,
+                 index: bool = False):
         super().__init__(column_type="FLOAT", primary_key=primary_key, 
-                         nullable=nullable, default=default, unique=unique)
+                         nullable=nullable, default=default, unique=unique, index=index)
 
 
 class BooleanField(Field):
     def __init__(self, primary_key: bool = False, nullable: bool = True, 
-                 default: Optional[bool] = None, unique: bool = False):
+                 default: Optional[bool] = None, unique: bool = False,
+                 index: bool = False):
         super().__init__(column_type="BOOLEAN", primary_key=primary_key, 
-                         nullable=nullable, default=default, unique=unique)
+                         nullable=nullable, default=default, unique=unique, index=index)
 
 
 class DateTimeField(Field):
     def __init__(self, primary_key: bool = False, nullable: bool = True, 
-                 default: Any = None, unique: bool = False):
+                 default: Any = None, unique: bool = False,
+                 index: bool = False):
         super().__init__(column_type="DATETIME", primary_key=primary_key, 
-                         nullable=nullable, default=default, unique=unique)
+                         nullable=nullable, default=default, unique=unique, index=index)
 
 
 class ForeignKey(Field):
-    def __init__(self, reference_model: Type[Any], nullable: bool = False, unique: bool = False):
+    """Reference to another model's primary key; the column is indexed unless `index=False`."""
+    def __init__(self, reference_model: Type[Any], nullable: bool = False, unique: bool = False,
+                 index: bool = True):
         super().__init__(column_type="INTEGER", primary_key=False, 
-                         nullable=nullable, unique=unique)
+                         nullable=nullable, unique=unique, index=index)
         self.reference_model = reference_model
 
-    def ddl(self, include_auto_increment: bool = False) -> str:
+    def ddl(self, include_auto_increment: bool = False, dialect: Any = None) -> str:
         # ForeignKey doesn't need auto_increment, so we ignore the parameter
-        return super().ddl(include_auto_increment)
+        return super().ddl(include_auto_increment, dialect)
 
 
 # Add QueryableMixin for use in Model
@@ -0,0 +1,103 @@
+"""
+Identity map: within a session every row is loaded into at most one instance.
+Primary key lookups and ForeignKey resolution are answered from the map before
+the database is asked, so resolving the same ForeignKey again is free.
+"""
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Optional
+
+# The map of the innermost session() of this thread or task
+_current: ContextVar = ContextVar("orm_identity_map", default=None)
+
+
+class IdentityMap:
+    """
+    Instances by (model, primary key), least recently used evicted beyond `max_size`.
+    Instances are kept as they are: a row loaded again returns the instance already
+    in the map, unsaved changes included.
+    """
+
+    def __init__(self, max_size: int = 10000):
+        if max_size < 1:
+            raise ValueError("max_size must be at least 1")
+        self.max_size = max_size
+        self._objects: "OrderedDict[tuple, Any]" = OrderedDict()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def __len__(self):
+        return len(self._objects)
+
+    def __contains__(self, obj) -> bool:
+        return self._objects.get(self._key(obj)) is obj
+
+    @staticmethod
+    def _key(obj):
+        cls = type(obj)
+        return cls, getattr(obj, cls._pk_name)
+
+    def get(self, model_cls, pk_value) -> Optional[Any]:
+        obj = self._objects.get((model_cls, pk_value))
+        if obj is None:
+            self._stats["misses"] += 1
+            return None
+        self._objects.move_to_end((model_cls, pk_value))
+        self._stats["hits"] += 1
+        return obj
+
+    def add(self, obj) -> Any:
+        """Make `obj` the instance for its primary key, replacing any other."""
+        key = self._key(obj)
+        if key[1] is None:
+            return obj
+        self._objects[key] = obj
+        self._objects.move_to_end(key)
+        if len(self._objects) > self.max_size:
+            self._objects.popitem(last=False)
+            self._stats["evictions"] += 1
+        return obj
+
+    def adopt(self, obj) -> Any:
+        """The instance already mapped for `obj`'s primary key, else `obj` (now mapped)."""
+        key = self._key(obj)
+        existing = self._objects.get(key)
+        if existing is not None:
+            self._objects.move_to_end(key)
+            return existing
+        return self.add(obj)
+
+    def discard(self, model_cls, pk_value) -> None:
+        self._objects.pop((model_cls, pk_value), None)
+
+    def discard_model(self, model_cls) -> None:
+        """Forget every instance of a model, e.g. after a set-based UPDATE/DELETE."""
+        for key in [key for key in self._objects if key[0] is model_cls]:
+            del self._objects[key]
+
+    def clear(self) -> None:
+        self._objects.clear()
+
+    def stats(self) -> Dict[str, int]:
+        stats = dict(self._stats)
+        stats["size"] = len(self._objects)
+        return stats
+
+
+def current() -> Optional[IdentityMap]:
+    """The identity map of the active session(), or None outside one."""
+    return _current.get()
+
+
+@contextmanager
+def session(max_size: int = 10000):
+    """
+    `with session() as identity_map:` - loads inside the block share one identity map.
+    The map belongs to this thread (or asyncio task) and is dropped on exit.
+    """
+    identity_map = IdentityMap(max_size)
+    token = _current.set(identity_map)
+    try:
+        yield identity_map
+    finally:
+        _current.reset(token)
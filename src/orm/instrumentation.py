@@ -0,0 +1,185 @@
+"""
+Visibility into the statements the ORM runs: before/after execute hooks,
+query capture for tests and N+1 detection.
+Nothing is timed or recorded unless a hook or a capture is active.
+"""
+import re
+import time
+import warnings
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import lru_cache
+from typing import Any, Callable, List, Optional
+
+_before_hooks: List[Callable[["QueryEvent"], None]] = []
+_after_hooks: List[Callable[["QueryEvent"], None]] = []
+
+# Per-thread / per-task listeners installed by capture_queries() and detect_n_plus_one()
+_listeners: ContextVar = ContextVar("orm_query_listeners", default=())
+
+# True while a ForeignKey is being resolved for a loaded row
+_resolving: ContextVar = ContextVar("orm_resolving_fk", default=False)
+
+_table_ref = re.compile(r"\b(?:FROM|INTO|UPDATE|TABLE(?: IF NOT EXISTS)?)\s+(\w+)", re.IGNORECASE)
+
+
+class NPlusOneWarning(UserWarning):
+    """The same statement ran once per loaded row (see detect_n_plus_one)."""
+
+
+class NPlusOneError(RuntimeError):
+    """Raised instead of NPlusOneWarning by detect_n_plus_one(raise_error=True)."""
+
+
+class QueryEvent:
+    """
+    One executed statement, as seen by the hooks.
+    `duration` (seconds), `rowcount` and `error` are None until it has run;
+    `rowcount` counts the rows returned by a SELECT, affected ones otherwise.
+    `from_row` is True when it ran to resolve a ForeignKey of a loaded instance.
+    """
+
+    __slots__ = ("sql", "params", "duration", "rowcount", "error", "from_row")
+
+    def __init__(self, sql: str, params: Any, from_row: bool = False):
+        self.sql = sql
+        self.params = params
+        self.duration: Optional[float] = None
+        self.rowcount: Optional[int] = None
+        self.error: Optional[BaseException] = None
+        self.from_row = from_row
+
+    @property
+    def model(self):
+        """The model whose table the statement reads or writes, if there is one."""
+        return model_for_sql(self.sql)
+
+    def __repr__(self):
+        duration = "" if self.duration is None else f" {self.duration * 1000:.3f}ms"
+        return f"<QueryEvent {self.sql!r}{duration}>"
+
+
+@lru_cache(maxsize=1024)
+def statement_table(sql: str) -> Optional[str]:
+    """The first table a statement reads or writes, lower-cased."""
+    match = _table_ref.search(sql)
+    return match.group(1).lower() if match else None
+
+
+def model_for_sql(sql: str):
+    from .metaclass import ModelMeta
+
+    return ModelMeta.registry.get(statement_table(sql))
+
+
+def add_hook(before: Callable[[QueryEvent], None] = None, after: Callable[[QueryEvent], None] = None):
+    """
+    Call `before(event)` ahead of every statement and `after(event)` once it finished
+    (also when it failed, with `event.error` set). Hooks run on the executing thread.
+    """
+    if before is not None:
+        _before_hooks.append(before)
+    if after is not None:
+        _after_hooks.append(after)
+
+
+def remove_hook(before: Callable[[QueryEvent], None] = None, after: Callable[[QueryEvent], None] = None):
+    if before is not None and before in _before_hooks:
+        _before_hooks.remove(before)
+    if after is not None and after in _after_hooks:
+        _after_hooks.remove(after)
+
+
+def active() -> bool:
+    """Whether anything is listening, i.e. statements have to be timed."""
+    return bool(_before_hooks or _after_hooks or _listeners.get())
+
+
+def start(sql: str, params: Any) -> QueryEvent:
+    event = QueryEvent(sql, params, _resolving.get())
+    for hook in _before_hooks:
+        hook(event)
+    event.duration = time.perf_counter()
+    return event
+
+
+def finish(event: QueryEvent, rowcount: Optional[int] = None, error: BaseException = None) -> None:
+    event.duration = time.perf_counter() - event.duration
+    event.rowcount = rowcount
+    event.error = error
+    for hook in _after_hooks:
+        hook(event)
+    for listener in _listeners.get():
+        listener(event)
+
+
+def rowcount_of(result: Any, return_last_id: bool = False) -> Optional[int]:
+    if isinstance(result, list):
+        return len(result)
+    if return_last_id:
+        return None
+    return result
+
+
+def resolve_fk(model, pk_value):
+    """get_by_pk() on behalf of a loaded row; the statement is flagged `from_row`."""
+    token = _resolving.set(True)
+    try:
+        return model.get_by_pk(pk_value)
+    finally:
+        _resolving.reset(token)
+
+
+@contextmanager
+def _listening(listener: Callable[[QueryEvent], None]):
+    token = _listeners.set(_listeners.get() + (listener,))
+    try:
+        yield
+    finally:
+        _listeners.reset(token)
+
+
+@contextmanager
+def capture_queries():
+    """
+    `with capture_queries() as queries:` collects a QueryEvent per statement run
+    by this thread (or task) inside the block.
+    """
+    queries: List[QueryEvent] = []
+    with _listening(queries.append):
+        yield queries
+
+
+@contextmanager
+def assert_num_queries(count: int):
+    """Fail with AssertionError unless the block runs exactly `count` statements."""
+    with capture_queries() as queries:
+        yield queries
+    if len(queries) != count:
+        listing = "\n".join(f"  {i}. {event.sql}" for i, event in enumerate(queries, 1))
+        raise AssertionError(f"{len(queries)} queries executed, {count} expected:\n{listing}")
+
+
+@contextmanager
+def detect_n_plus_one(threshold: int = 3, raise_error: bool = False):
+    """
+    Flag statements run repeatedly to resolve ForeignKeys of loaded rows (the N+1
+    pattern select_related/prefetch_related avoid). When one statement text runs
+    `threshold` times from from_row inside the block, NPlusOneWarning is issued on exit,
+    or NPlusOneError raised with `raise_error`. Yields {sql: count} of those statements.
+    """
+    counts = {}
+
+    def listener(event):
+        if event.from_row:
+            counts[event.sql] = counts.get(event.sql, 0) + 1
+
+    with _listening(listener):
+        yield counts
+    repeated = {sql: n for sql, n in counts.items() if n >= threshold}
+    if repeated:
+        listing = "\n".join(f"  {n}x {sql}" for sql, n in repeated.items())
+        message = f"N+1 queries while loading rows, use select_related/prefetch_related:\n{listing}"
+        if raise_error:
+            raise NPlusOneError(message)
+        warnings.warn(message, NPlusOneWarning, stacklevel=3)
@@ -1,10 +1,18 @@
+import re
+import zlib
+
 from .fields import IntegerField
-from .fields import Field
+from .fields import Field, ForeignKey
+from .instrumentation import resolve_fk
 
 class ModelMeta(type):
+    # Models by table name, used to attribute statements to models
+    registry = {}
+
     def __new__(cls, name, bases, attrs):
         fields = {}
         primary_keys = []
+        meta = attrs.pop("Meta", None)
 
         # Collect declared fields and primary keys
         for key, value in list(attrs.items()):
@@ -20,7 +28,7 @@ class ModelMeta(type):
             id_field = IntegerField()
             id_field.name = "id"
             id_field.primary_key = True
-            id_field.auto_increment = True  
+            id_field.auto_increment = True
             fields["id"] = id_field
 
         # Validate only one primary key
@@ -29,4 +37,153 @@ class ModelMeta(type):
 
         attrs["_fields"] = fields
         attrs["_table"] = name.lower()
-        return super().__new__(cls, name, bases, attrs)
+
+        # Meta.slots: fixed attribute layout instead of a per-instance __dict__
+        slots = bool(getattr(meta, "slots", False))
+        if slots:
+            attrs["__slots__"] = tuple(fields) + ("_original",)
+        attrs["_slots"] = slots
+
+        model = super().__new__(cls, name, bases, attrs)
+        cls._prepare(model)
+        model._indexes = cls._plan_indexes(model, getattr(meta, "indexes", ()))
+        return model
+
+    @staticmethod
+    def _prepare(model):
+        """Work out everything save() and from_row() need once, at class creation."""
+        fields = model._fields
+        pk_field = next(f for f in fields.values() if f.primary_key)
+        model._pk_field = pk_field
+        model._pk_name = pk_field.name
+        model._columns = tuple(fields)
+        model._column_index = {name: i for i, name in enumerate(fields)}
+
+        # (name, nullable, default, FK target pk) per column, see Model._plan_values
+        plan = []
+        for name, field in fields.items():
+            fk_pk = None
+            if isinstance(field, ForeignKey):
+                fk_pk = field.reference_model._pk_name
+            plan.append((name, field.nullable, field.default, fk_pk))
+        model._plan = tuple(plan)
+        model._plan_by_name = {p[0]: p for p in plan}
+        model._plan_auto = tuple(p for p in plan if p[0] != pk_field.name)
+
+        model._sql_cache = {}
+        ModelMeta.registry[model._table] = model
+        model._tuple_loader, model._row_loader = ModelMeta._build_row_loaders(model)
+
+    _index_column = re.compile(r"^(\w+)(?:\((\d+)\))?$")
+
+    @staticmethod
+    def _plan_indexes(model, declared):
+        """
+        The model's indexes as (name, ((column, prefix length or None), ...)):
+        Meta.indexes entries (a column or a tuple of columns, `"name(10)"` for a prefix
+        of a StringField), then `index=True` fields and ForeignKeys not already covered
+        by a unique/primary key or by an index starting with them.
+        """
+        indexes = []
+        for entry in declared:
+            specs = (entry,) if isinstance(entry, str) else tuple(entry)
+            if not specs:
+                raise ValueError(f"Empty index in {model.__name__}.Meta.indexes")
+            columns = []
+            for spec in specs:
+                match = ModelMeta._index_column.match(spec)
+                field = model._fields.get(match.group(1)) if match else None
+                if field is None:
+                    raise ValueError(f"Unknown index column '{spec}' for {model.__name__}")
+                prefix = match.group(2) and int(match.group(2))
+                if prefix and not field.column_type.upper().startswith("VARCHAR"):
+                    raise ValueError(f"Prefix length on non-string column '{spec}' of {model.__name__}")
+                columns.append((field.name, prefix))
+            indexes.append(tuple(columns))
+
+        leading = {columns[0][0] for columns in indexes}
+        for name, field in model._fields.items():
+            if field.index and not field.primary_key and not field.unique and name not in leading:
+                indexes.append(((name, None),))
+
+        return tuple((ModelMeta._index_name(model._table, columns), columns) for columns in indexes)
+
+    @staticmethod
+    def _index_name(table, columns):
+        name = f"idx_{table}_{'_'.join(column for column, _ in columns)}"
+        if len(name) > 64:
+            # MySQL identifiers stop at 64 characters
+            name = f"{name[:55]}_{zlib.crc32(name.encode()):08x}"
+        return name
+
+    def _sql(cls, dialect):
+        """
+        Statement templates of the model for `dialect`, built on first use and cached.
+        Partial UPDATEs are cached under ("update", field names).
+        """
+        sql = cls._sql_cache.get(dialect)
+        if sql is None:
+            ph = dialect.placeholder
+            table, pk = cls._table, cls._pk_name
+            auto = [name for name in cls._columns if name != pk]
+            sql = {
+                "insert": f"INSERT INTO {table} ({', '.join(cls._columns)}) "
+                          f"VALUES ({dialect.placeholders(len(cls._columns))})",
+                "insert_auto": f"INSERT INTO {table} ({', '.join(auto)}) "
+                               f"VALUES ({dialect.placeholders(len(auto))})",
+                "update": f"UPDATE {table} SET {', '.join(f'{n} = {ph}' for n in auto)} WHERE {pk} = {ph}",
+                "delete": f"DELETE FROM {table} WHERE {pk} = {ph}",
+                "select_pk": f"SELECT * FROM {table} WHERE {pk} = {ph}",
+                "columns": ", ".join(f"{table}.{name}" for name in cls._columns),
+            }
+            cls._sql_cache[dialect] = sql
+        return sql
+
+    def _update_sql(cls, dialect, names):
+        """UPDATE template writing only `names` (a tuple), cached per dialect."""
+        sql = cls._sql(dialect)
+        key = ("update", names)
+        statement = sql.get(key)
+        if statement is None:
+            ph = dialect.placeholder
+            assignments = ", ".join(f"{name} = {ph}" for name in names)
+            statement = sql[key] = f"UPDATE {cls._table} SET {assignments} WHERE {cls._pk_name} = {ph}"
+        return statement
+
+    @staticmethod
+    def _build_row_loaders(model):
+        """
+        Generate the model's row -> instance functions:
+        `load_tuple(row, related=None)` takes a tuple in column order (tuple cursors) and
+        `load(row, related=None)` a dict row. The columns are assigned by tuple unpacking,
+        with no per-field loop or isinstance check; only ForeignKeys get a branch.
+        The column tuple doubles as the dirty-tracking snapshot.
+        """
+        targets = "".join(f"obj.{name}, " for name in model._columns)
+        lines = [
+            "def load_tuple(row, related=None):",
+            "    obj = new(model)",
+            f"    {targets}= row",
+            "    obj._original = row",
+        ]
+        for i, (name, field) in enumerate(model._fields.items()):
+            if isinstance(field, ForeignKey):
+                lines += [
+                    f"    if related is not None and {name!r} in related:",
+                    f"        obj.{name} = related[{name!r}]",
+                    f"    elif row[{i}] is not None:",
+                    f"        obj.{name} = resolve(refs[{name!r}], row[{i}])",
+                ]
+        lines += [
+            "    return obj",
+            "",
+            "def load(row, related=None):",
+            "    get = row.get",
+            "    return load_tuple((" + "".join(f"get({name!r}), " for name in model._columns) + "), related)",
+        ]
+
+        refs = {name: field.reference_model for name, field in model._fields.items()
+                if isinstance(field, ForeignKey)}
+        namespace = {"new": object.__new__, "model": model, "refs": refs, "resolve": resolve_fk}
+        exec("\n".join(lines), namespace)
+        return namespace["load_tuple"], namespace["load"]
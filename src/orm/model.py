@@ -2,21 +2,42 @@ from typing import Any, Dict, Type, List
 from .fields import ForeignKey
 
 """ Connection to the database 👇"""
-from .connection import run_query
+from .backends import UniqueViolation
+from .connection import run_query, run_many, get_backend, atomic, queue_save, primary_database
+from .aio import arun_query, aatomic, get_async_backend
+from .instrumentation import resolve_fk
+from . import identity
 
 from .metaclass import ModelMeta
 from .query import QueryableMixin
 
 
+# Snapshot marker of a column that only()/defer() left out of the SELECT
+DEFERRED = object()
+# Snapshot marker of a column whose database value is unknown, it counts as dirty
+UNSAVED = object()
+
+
 class Model(QueryableMixin, metaclass=ModelMeta):
     """
     CRUD methods and model initialization.
+    Declare `class Meta: slots = True` on a model to give its instances __slots__
+    and hydrate its querysets from tuple cursors.
     """
 
+    __slots__ = ()
+
+    # Unique fields are enforced by the database, which raises UniqueViolation.
+    # Set to True on a model to also check them with a query before each write.
+    unique_precheck = False
+
+    # Seconds the model's querysets may serve results from the result cache
+    # (see QuerySet.cache()); None leaves caching to .cache() calls.
+    cache_ttl = None
+
     def __str__(self):
         # Return a more meaningful string representation
-        pk_field = self.get_primary_key_field()
-        pk_value = getattr(self, pk_field.name)
+        pk_value = getattr(self, self._pk_name)
         return f"<{self.__class__.__name__}: {pk_value}>"
 
     def __repr__(self):
@@ -27,136 +48,533 @@ class Model(QueryableMixin, metaclass=ModelMeta):
         for field_name, field in self._fields.items():
             value = kwargs.get(field_name, field.default)
             setattr(self, field_name, value)
+        # Column values (in column order) as last read from / written to the database
+        self._original = None
+
+    def __getattr__(self, name):
+        """
+        Only reached for fields that are not set yet: columns left out by only()/defer(),
+        which are read now, and ForeignKeys of such partial instances, resolved now.
+        """
+        cls = type(self)
+        index = cls._column_index.get(name)
+        if index is None:
+            raise AttributeError(f"'{cls.__name__}' object has no attribute '{name}'")
+        try:
+            original = object.__getattribute__(self, "_original")
+        except AttributeError:
+            original = None
+        if original is None:
+            raise AttributeError(f"'{cls.__name__}' object has no attribute '{name}'")
+
+        raw = original[index]
+        if raw is DEFERRED:
+            pk_value = getattr(self, cls._pk_name)
+            ph = get_backend().dialect.placeholder
+            rows = run_query(f"SELECT {name} FROM {cls._table} WHERE {cls._pk_name} = {ph}",
+                             params=(pk_value,), as_tuples=True)
+            raw = rows[0][0] if rows else None
+            self._original = original[:index] + (raw,) + original[index + 1:]
+
+        field = cls._fields[name]
+        value = raw
+        if isinstance(field, ForeignKey) and raw is not None:
+            value = resolve_fk(field.reference_model, raw)
+        setattr(self, name, value)
+        return value
+
+    def _is_loaded(self, name: str) -> bool:
+        """False for a deferred or lazy field that was never read or assigned."""
+        try:
+            object.__getattribute__(self, name)
+        except AttributeError:
+            return False
+        return True
+
+    def _db_value(self, name: str) -> Any:
+        """The column value of a field, ForeignKey objects replaced by their primary key."""
+        val = getattr(self, name)
+        if val is not None and hasattr(val, "_fields") and isinstance(self._fields[name], ForeignKey):
+            val = getattr(val, val.get_primary_key_field().name)
+        return val
+
+    def _snapshot(self, names=None):
+        """
+        Remember the current values of `names` (all fields by default) as saved;
+        in a session() the instance becomes the mapped one for its primary key.
+        """
+        if names is None or self._original is None:
+            self._original = tuple(self._db_value(name) for name in self._columns)
+        else:
+            original = list(self._original)
+            for name in names:
+                original[self._column_index[name]] = self._db_value(name)
+            self._original = tuple(original)
+        identity_map = identity.current()
+        if identity_map is not None:
+            identity_map.add(self)
+
+    def get_dirty_fields(self) -> List[str]:
+        """Non primary key fields changed since the instance was loaded or saved."""
+        pk_name = self._pk_name
+        original = self._original
+        if original is None:
+            return [name for name in self._columns if name != pk_name]
+        return [name for name, old in zip(self._columns, original)
+                if name != pk_name and self._is_loaded(name) and self._db_value(name) != old]
+
+    def save(self, update_fields: List[str] = None):
+        """
+        INSERT a new instance or UPDATE an existing one.
+        An UPDATE only writes the fields changed since the instance was loaded
+        (or the given `update_fields`) and is skipped when nothing changed.
+        """
+        # Inside atomic(batch_saves=True) the write happens when the block exits
+        if update_fields is None and queue_save(self):
+            return
+
+        statement = self._save_sql(get_backend().dialect, update_fields)
+        if statement is None:
+            # Nothing changed, no round trip
+            return
+        sql, params, names = statement
+        if self.unique_precheck:
+            self.check_unique([self], names)
+
+        if names is None:
+            last_id = run_query(sql, params=params, return_last_id=True)
+            setattr(self, self._pk_name, last_id)
+            self._snapshot()
+        else:
+            run_query(sql, params=params)
+            self._snapshot(names)
 
-    def save(self):
-        pk_field = self.get_primary_key_field()
-        pk_value = getattr(self, pk_field.name)
+    async def asave(self, update_fields: List[str] = None):
+        """async save(), same rules; atomic(batch_saves=True) queues don't apply."""
+        statement = self._save_sql(get_async_backend().dialect, update_fields)
+        if statement is None:
+            return
+        sql, params, names = statement
+        if self.unique_precheck:
+            await self.acheck_unique([self], names)
 
-        # Check for unique constraint violations before saving
-        self._check_unique_constraints(pk_value)
+        if names is None:
+            last_id = await arun_query(sql, params=params, return_last_id=True)
+            setattr(self, self._pk_name, last_id)
+            self._snapshot()
+        else:
+            await arun_query(sql, params=params)
+            self._snapshot(names)
+
+    def _save_sql(self, dialect, update_fields=None):
+        """
+        The statement save() runs as (sql, params, names written), names being None
+        for an INSERT. None when an existing instance has nothing to write.
+        """
+        cls = type(self)
+        pk_name = cls._pk_name
+        pk_value = getattr(self, pk_name)
 
         if pk_value is None:
-            # INSERT
-            columns = []
-            values = []
-            placeholders = []
-
-            for name, field in self._fields.items():
-                val = getattr(self, name)
-                
-                # Skip primary key if it's None (auto-increment)
-                if field.primary_key and val is None:
-                    continue
-                
-                # Handle nullable fields
-                if val is None:
-                    if not field.nullable:
-                        if field.default is not None:
-                            # Use default value for non-nullable fields
-                            val = field.default
-                        else:
-                            raise ValueError(f"Field '{name}' cannot be null")
-                    # For nullable fields, we keep None value
-                elif isinstance(field, ForeignKey) and val is not None:
-                    # Convert ForeignKey object to its primary key value
-                    pk_f = field.reference_model.get_primary_key_field()
-                    val = getattr(val, pk_f.name)
-                
-                columns.append(name)
-                values.append(val)
-                placeholders.append("%s")
-
-            cols_sql = ", ".join(columns)
-            ph_sql = ", ".join(placeholders)
-            sql = f"INSERT INTO {self._table} ({cols_sql}) VALUES ({ph_sql})"
-
-            last_id = run_query(sql, params=tuple(values), return_last_id=True)
-            setattr(self, pk_field.name, last_id)
+            # INSERT, the primary key is left to auto increment
+            values = self._plan_values(cls._plan_auto)
+            return cls._sql(dialect)["insert_auto"], tuple(values), None
+
+        if update_fields is not None:
+            unknown = [name for name in update_fields if name not in self._fields]
+            if unknown:
+                raise ValueError(f"Unknown field(s) in update_fields: {', '.join(unknown)}")
+            names = tuple(name for name in update_fields if name != pk_name)
+        else:
+            names = tuple(self.get_dirty_fields())
+        if not names:
+            return None
+
+        # UPDATE
+        plan_by_name = cls._plan_by_name
+        values = self._plan_values([plan_by_name[name] for name in names])
+        values.append(pk_value)
+        return cls._update_sql(dialect, names), tuple(values), names
+
+    @classmethod
+    def bulk_create(cls, objs, batch_size: int = 1000, return_ids: bool = True) -> List["Model"]:
+        """
+        Insert many instances with multi-row INSERT statements inside one transaction.
+        Unique constraints are left to the database (UniqueViolation), or checked with
+        one query per batch when the model sets `unique_precheck`.
+        With `return_ids` the generated primary keys are set on the instances.
+        """
+        objs = list(objs)
+        if not objs:
+            return objs
+        dialect = get_backend().dialect
+        with atomic():
+            for sql, params, batch, auto_pk in cls._insert_batches(objs, batch_size, dialect):
+                if cls.unique_precheck:
+                    cls.check_unique(batch)
+                last_id = run_query(sql, params=params, return_last_id=True)
+                cls._inserted(batch, last_id, return_ids and auto_pk, dialect)
+        return objs
+
+    @classmethod
+    async def abulk_create(cls, objs, batch_size: int = 1000, return_ids: bool = True) -> List["Model"]:
+        """async bulk_create(): the same INSERTs inside one aatomic() transaction."""
+        objs = list(objs)
+        if not objs:
+            return objs
+        dialect = get_async_backend().dialect
+        async with aatomic():
+            for sql, params, batch, auto_pk in cls._insert_batches(objs, batch_size, dialect):
+                if cls.unique_precheck:
+                    await cls.acheck_unique(batch)
+                last_id = await arun_query(sql, params=params, return_last_id=True)
+                cls._inserted(batch, last_id, return_ids and auto_pk, dialect)
+        return objs
+
+    @classmethod
+    def _insert_batches(cls, objs, batch_size, dialect):
+        """
+        Yield (sql, params, batch, auto_pk) for each multi-row INSERT of bulk_create.
+        Rows with and without an explicit primary key need different column lists.
+        """
+        pk_name = cls._pk_name
+        plan = cls._plan
+        groups = (
+            ([obj for obj in objs if getattr(obj, pk_name) is not None], plan),
+            ([obj for obj in objs if getattr(obj, pk_name) is None], cls._plan_auto),
+        )
+        for group, columns in groups:
+            if not group:
+                continue
+            auto_pk = len(columns) != len(plan)
+            cols_sql = ", ".join(c[0] for c in columns)
+            row_sql = f"({dialect.placeholders(len(columns))})"
+            per_batch = max(1, min(batch_size, dialect.max_params // max(1, len(columns))))
+
+            for start in range(0, len(group), per_batch):
+                batch = group[start:start + per_batch]
+                values = []
+                for obj in batch:
+                    values.extend(obj._plan_values(columns))
+                sql = f"INSERT INTO {cls._table} ({cols_sql}) VALUES {', '.join([row_sql] * len(batch))}"
+                yield sql, tuple(values), batch, auto_pk
+
+    @classmethod
+    def _inserted(cls, batch, last_id, set_ids, dialect):
+        """Give a just inserted batch its generated primary keys and mark it saved."""
+        if set_ids:
+            pk_name = cls._pk_name
+            for obj, pk in zip(batch, dialect.inserted_ids(last_id, len(batch))):
+                setattr(obj, pk_name, pk)
+        for obj in batch:
+            obj._snapshot()
+
+    @classmethod
+    def bulk_upsert(cls, objs, conflict_fields, update_fields: List[str] = None, batch_size: int = 1000,
+                    return_ids: bool = True) -> List["Model"]:
+        """
+        Insert many instances, updating the existing row instead where one with the same
+        `conflict_fields` (the primary key or a unique field) exists: multi-row
+        INSERT ... ON DUPLICATE KEY UPDATE on MySQL, ON CONFLICT ... DO UPDATE on SQLite.
+        `update_fields` are the columns overwritten on a conflict, all the others by
+        default; an empty list keeps existing rows as they are.
+        With `return_ids` the primary keys of instances without one are read back
+        with one query per batch.
+        """
+        if isinstance(conflict_fields, str):
+            conflict_fields = [conflict_fields]
+        conflict_fields = list(conflict_fields)
+        if not conflict_fields:
+            raise ValueError("bulk_upsert needs at least one conflict field")
+        for name in conflict_fields:
+            field = cls._fields.get(name)
+            if field is None:
+                raise ValueError(f"Unknown field '{name}' for {cls.__name__}")
+            if not (field.primary_key or field.unique):
+                raise ValueError(f"Conflict field '{name}' is neither the primary key nor unique")
+
+        pk_name = cls._pk_name
+        if update_fields is None:
+            update_fields = [name for name in cls._columns if name != pk_name and name not in conflict_fields]
         else:
-            # UPDATE
-            assignments = []
-            values = []
+            unknown = [name for name in update_fields if name not in cls._fields]
+            if unknown:
+                raise ValueError(f"Unknown field(s) in update_fields: {', '.join(unknown)}")
+            if pk_name in update_fields:
+                raise ValueError(f"Cannot update primary key '{pk_name}'")
+
+        objs = list(objs)
+        if not objs:
+            return objs
+        # The row of an instance without a primary key is found again by a unique field
+        key = next((name for name in conflict_fields if name != pk_name), None)
+        if return_ids and key is not None:
+            for obj in objs:
+                if getattr(obj, pk_name) is None and obj._db_value(key) is None:
+                    raise ValueError(f"Conflict field '{key}' cannot be null")
 
-            for name, field in self._fields.items():
-                if field.primary_key:
+        dialect = get_backend().dialect
+        clause = dialect.upsert_sql(conflict_fields, update_fields)
+        # Columns the row holds afterwards whether it was inserted or updated
+        written = {pk_name, *conflict_fields, *update_fields}
+        with atomic():
+            for sql, params, batch, auto_pk in cls._insert_batches(objs, batch_size, dialect):
+                if return_ids and auto_pk and key is None:
+                    # Only the primary key can conflict and these rows have none: plain inserts
+                    last_id = run_query(sql + clause, params=params, return_last_id=True)
+                    cls._inserted(batch, last_id, True, dialect)
                     continue
-                    
-                val = getattr(self, name)
-                
-                # Handle nullable fields in UPDATE
-                if val is None:
-                    if not field.nullable:
-                        if field.default is not None:
-                            # Use default value for non-nullable fields
-                            val = field.default
-                        else:
-                            raise ValueError(f"Field '{name}' cannot be null")
-                    # For nullable fields, we keep None value
-                elif isinstance(field, ForeignKey) and val is not None:
-                    # Convert ForeignKey object to its primary key value
-                    pk_f = field.reference_model.get_primary_key_field()
-                    val = getattr(val, pk_f.name)
-                
-                assignments.append(f"{name} = %s")
-                values.append(val)
-
-            values.append(pk_value)
-            set_sql = ", ".join(assignments)
-            sql = f"UPDATE {self._table} SET {set_sql} WHERE {pk_field.name} = %s"
-            run_query(sql, params=tuple(values))
-
-    def _check_unique_constraints(self, current_pk_value):
-        """Check if any unique constraints would be violated by saving this object."""
-        # Get the primary key field for the current model
-        pk_field = self.get_primary_key_field()
-        
-        for name, field in self._fields.items():
-            if field.unique:
-                value = getattr(self, name)
-                
-                # Skip None values for unique fields (they don't violate unique constraint)
+                run_query(sql + clause, params=params)
+                if return_ids and auto_pk:
+                    cls._upserted_ids(batch, key, dialect)
+                cls._upserted(batch, written)
+        return objs
+
+    @classmethod
+    def _upserted(cls, batch, written):
+        """
+        Mark the `written` columns of an upserted batch as saved. Which rows hit a
+        conflict is unknown, so the other columns stay dirty for a later save().
+        """
+        names = [name for name in cls._columns if name in written]
+        for obj in batch:
+            if obj._original is None:
+                obj._original = (UNSAVED,) * len(cls._columns)
+            obj._snapshot(names)
+
+    @classmethod
+    def _upserted_ids(cls, batch, key, dialect):
+        """Set the primary keys of an upserted batch, looked up by the unique field `key`."""
+        pk_name = cls._pk_name
+        values = [obj._db_value(key) for obj in batch]
+        sql = (f"SELECT {pk_name}, {key} FROM {cls._table} "
+               f"WHERE {key} IN ({dialect.placeholders(len(values))})")
+        ids = {row[key]: row[pk_name] for row in run_query(sql, params=tuple(values))}
+        for obj, value in zip(batch, values):
+            setattr(obj, pk_name, ids.get(value))
+
+    @classmethod
+    def bulk_get_or_create(cls, keys, lookup: str = None, batch_size: int = 1000) -> List["Model"]:
+        """
+        The instance for each key, creating the missing rows. Existing rows are read
+        with one `WHERE lookup IN (...)` query and the rest inserted by bulk_create,
+        in one transaction. A key is a dict of field values (used to create the row)
+        or just the `lookup` value; `lookup` is the primary key or a unique field,
+        by default the model's only unique field.
+        Returns one instance per key, in order, with its primary key set.
+        """
+        if lookup is None:
+            unique = [name for name, field in cls._fields.items() if field.unique and not field.primary_key]
+            if len(unique) != 1:
+                raise ValueError(f"{cls.__name__} has {len(unique)} unique fields, pass `lookup`")
+            lookup = unique[0]
+        field = cls._fields.get(lookup)
+        if field is None:
+            raise ValueError(f"Unknown field '{lookup}' for {cls.__name__}")
+        if not (field.primary_key or field.unique):
+            raise ValueError(f"Lookup field '{lookup}' is neither the primary key nor unique")
+
+        keys = [key if isinstance(key, dict) else {lookup: key} for key in keys]
+        values, wanted = [], {}  # lookup value per key, first key per value
+        for key in keys:
+            if lookup not in key:
+                raise ValueError(f"Key {key!r} has no '{lookup}'")
+            value = key[lookup]
+            if hasattr(value, "_fields"):
+                value = getattr(value, value.get_primary_key_field().name)
+            if value is None:
+                raise ValueError(f"Lookup field '{lookup}' cannot be null")
+            values.append(value)
+            wanted.setdefault(value, key)
+        if not wanted:
+            return []
+
+        # Dict rows with the ForeignKeys prefetched, not resolved row by row
+        queryset = cls.objects().prefetch_related(
+            *[name for name, field in cls._fields.items() if isinstance(field, ForeignKey)])
+        queryset._tuple_rows = False
+        dialect = get_backend().dialect
+        found: Dict[Any, "Model"] = {}
+        with atomic():
+            pending = list(wanted)
+            for start in range(0, len(pending), dialect.max_params):
+                chunk = pending[start:start + dialect.max_params]
+                sql = f"SELECT * FROM {cls._table} WHERE {lookup} IN ({dialect.placeholders(len(chunk))})"
+                for obj in queryset._build(run_query(sql, params=tuple(chunk))):
+                    found[obj._db_value(lookup)] = obj
+            missing = {value: cls(**key) for value, key in wanted.items() if value not in found}
+            cls.bulk_create(list(missing.values()), batch_size)
+            found.update(missing)
+        return [found[value] for value in values]
+
+    def _plan_values(self, plan) -> List[Any]:
+        """
+        Column values of this instance for the `_plan` entries given, non-nullable
+        fields fall back to their default and ForeignKey objects become their primary key.
+        """
+        values = []
+        for name, nullable, default, fk_pk in plan:
+            val = getattr(self, name)
+            if val is None:
+                if not nullable:
+                    if default is None:
+                        raise ValueError(f"Field '{name}' cannot be null")
+                    val = default
+            elif fk_pk is not None and hasattr(val, "_fields"):
+                val = getattr(val, fk_pk)
+            values.append(val)
+        return values
+
+    @classmethod
+    def _save_batch(cls, objs: List["Model"]):
+        """
+        Write queued saves: new objects through bulk_create, changed ones with one
+        executemany UPDATE per set of dirty fields. Clean objects are skipped.
+        """
+        pk_name = cls._pk_name
+        new = [obj for obj in objs if getattr(obj, pk_name) is None]
+        if new:
+            cls.bulk_create(new)
+
+        by_fields: Dict[tuple, List["Model"]] = {}
+        for obj in objs:
+            if getattr(obj, pk_name) is not None:
+                dirty = tuple(obj.get_dirty_fields())
+                if dirty:
+                    by_fields.setdefault(dirty, []).append(obj)
+
+        dialect = get_backend().dialect
+        for names, batch in by_fields.items():
+            if cls.unique_precheck:
+                cls.check_unique(batch, names)
+            columns = [cls._plan_by_name[name] for name in names]
+            run_many(cls._update_sql(dialect, names), [tuple(obj._plan_values(columns)) + (getattr(obj, pk_name),)
+                           for obj in batch])
+            for obj in batch:
+                obj._snapshot(names)
+
+    @classmethod
+    def check_unique(cls, objs, names=None):
+        """
+        Pre-check the unique fields of a batch of instances with a single query
+        (`WHERE a IN (...) OR b IN (...)`). Raises UniqueViolation on a clash with an
+        existing row or between the instances themselves. `names` limits the fields checked.
+        """
+        query = cls._unique_query(objs, names, get_backend().dialect)
+        if query is not None:
+            sql, params, wanted = query
+            # A replica may lag behind the rows the write will meet
+            cls._unique_conflicts(run_query(sql, params=params, using=primary_database()), wanted)
+
+    @classmethod
+    async def acheck_unique(cls, objs, names=None):
+        """async check_unique()."""
+        query = cls._unique_query(objs, names, get_async_backend().dialect)
+        if query is not None:
+            sql, params, wanted = query
+            cls._unique_conflicts(await arun_query(sql, params=params), wanted)
+
+    @classmethod
+    def _unique_query(cls, objs, names, dialect):
+        """(sql, params, wanted values) for check_unique, None when there is nothing to check."""
+        pk_name = cls._pk_name
+        fields = [name for name, field in cls._fields.items()
+                  if field.unique and not field.primary_key and (names is None or name in names)]
+
+        wanted: Dict[str, Dict[Any, Any]] = {}  # field -> {value: pk of the instance}
+        for obj in objs:
+            pk_value = getattr(obj, pk_name)
+            for name in fields:
+                value = obj._db_value(name)
+                # None values don't violate a unique constraint
                 if value is None:
                     continue
-                    
-                # For ForeignKey fields, get the actual PK value
-                if isinstance(field, ForeignKey) and value is not None:
-                    pk_f = field.reference_model.get_primary_key_field()
-                    value = getattr(value, pk_f.name)
-                
-                # Check if another object already has this value
-                existing_objects = self.__class__.objects().filter(**{name: value})
-                
-                for obj in existing_objects:
-                    # Skip the current object if we're updating
-                    if current_pk_value is not None and getattr(obj, pk_field.name) == current_pk_value:
-                        continue
-                        
-                    # If we found another object with the same value, raise error
-                    raise ValueError(f"Unique constraint violation: {name}='{value}' already exists")
+                seen = wanted.setdefault(name, {})
+                if value in seen and (pk_value is None or seen[value] != pk_value):
+                    raise UniqueViolation(name, value, cls._table)
+                seen[value] = pk_value
+        if not wanted:
+            return None
+
+        clauses, params = [], []
+        for name, values in wanted.items():
+            clauses.append(f"{name} IN ({dialect.placeholders(len(values))})")
+            params.extend(values)
+        sql = f"SELECT {pk_name}, {', '.join(wanted)} FROM {cls._table} WHERE {' OR '.join(clauses)}"
+        return sql, tuple(params), wanted
+
+    @classmethod
+    def _unique_conflicts(cls, rows, wanted):
+        pk_name = cls._pk_name
+        for row in rows:
+            for name, values in wanted.items():
+                value = row[name]
+                # The row itself is not a duplicate of the instance being updated
+                if value in values and values[value] != row[pk_name]:
+                    raise UniqueViolation(name, value, cls._table)
 
     def delete(self):
         """Delete this model instance from the database."""
-        pk_field = self.get_primary_key_field()
-        pk_value = getattr(self, pk_field.name)
-        sql = f"DELETE FROM {self._table} WHERE {pk_field.name} = %s"
-        run_query(sql % repr(pk_value))
+        pk_value = getattr(self, self._pk_name)
+        run_query(type(self)._sql(get_backend().dialect)["delete"], params=(pk_value,))
+        self._forget(pk_value)
+
+    async def adelete(self):
+        """async delete()."""
+        pk_value = getattr(self, self._pk_name)
+        await arun_query(type(self)._sql(get_async_backend().dialect)["delete"], params=(pk_value,))
+        self._forget(pk_value)
+
+    def _forget(self, pk_value):
+        identity_map = identity.current()
+        if identity_map is not None:
+            identity_map.discard(type(self), pk_value)
+
+    @classmethod
+    def from_row(cls, row: dict, related: Dict[str, Any] = None):
+        """
+        Convert DB row to Model instance with ForeignKeys resolved.
+        `related` holds already loaded objects by field name (select_related / prefetch_related),
+        those ForeignKeys are not queried again.
+        The work is done by the loader ModelMeta generated for the model (no __init__ call).
+        """
+        return cls._row_loader(row, related)
 
     @classmethod
-    def from_row(cls, row: dict):
-        """Convert DB row to Model instance with ForeignKeys resolved."""
-        kwargs = {}
+    def _from_partial_row(cls, row: dict):
+        """
+        Instance from a row holding only some columns (only()/defer()).
+        Missing columns are DEFERRED in the snapshot and ForeignKeys stay raw ids;
+        both are loaded by __getattr__ on first access.
+        """
+        obj = object.__new__(cls)
+        original = []
         for name, field in cls._fields.items():
-            value = row.get(name)
-            if isinstance(field, ForeignKey) and value is not None:
-                # پیدا کردن مدل رفرنس
-                ref_model = field.reference_model
-                ref_pk = ref_model.get_primary_key_field().name
-                # گرفتن آبجکت کامل
-                ref_obj = ref_model.filter(**{ref_pk: value})
-                kwargs[name] = ref_obj[0] if ref_obj else None
+            if name in row:
+                value = row[name]
+                if not isinstance(field, ForeignKey):
+                    setattr(obj, name, value)
             else:
-                kwargs[name] = value
-        return cls(**kwargs)
+                value = DEFERRED
+            original.append(value)
+        obj._original = tuple(original)
+        return obj
+
+    @classmethod
+    def get_by_pk(cls, pk_value):
+        """The instance with this primary key, or None. Inside a session() the identity map is asked first."""
+        identity_map = identity.current()
+        if identity_map is not None:
+            obj = identity_map.get(cls, pk_value)
+            if obj is not None:
+                return obj
+        rows = run_query(cls._sql(get_backend().dialect)["select_pk"], params=(pk_value,))
+        if not rows:
+            return None
+        obj = cls._row_loader(rows[0])
+        if identity_map is not None:
+            obj = identity_map.adopt(obj)
+        return obj
 
     @classmethod
     def all(cls) -> List["Model"]:
@@ -168,9 +586,10 @@ class Model(QueryableMixin, metaclass=ModelMeta):
     def filter(cls, **conditions) -> List["Model"]:
         where_clauses = []
         values = []
+        ph = get_backend().dialect.placeholder
 
         for k, v in conditions.items():
-            where_clauses.append(f"{k} = %s")
+            where_clauses.append(f"{k} = {ph}")
             # اگر foreign key object پاس داده باشیم
             field = cls._fields.get(k)
             if isinstance(field, ForeignKey) and v is not None:
@@ -185,20 +604,47 @@ class Model(QueryableMixin, metaclass=ModelMeta):
 
     @classmethod
     def create_table(cls):
-        """Generate and run CREATE TABLE statement for this model."""
+        """
+        Generate and run CREATE TABLE statement for this model, with its indexes
+        (Meta.indexes, `index=True` fields and ForeignKeys).
+        """
         cols = []
+        dialect = get_backend().dialect
         for name, field in cls._fields.items():
             # For unique fields, we need to handle them differently in some databases
-            ddl = field.ddl(include_auto_increment=True)
+            ddl = field.ddl(include_auto_increment=True, dialect=dialect)
             cols.append(f"{name} {ddl}")
+        if dialect.inline_indexes:
+            for index_name, columns in cls._indexes:
+                cols.append(f"INDEX {index_name} ({dialect.index_columns(columns)})")
 
         cols_sql = ", ".join(cols)
         sql = f"CREATE TABLE IF NOT EXISTS {cls._table} ({cols_sql});"
         run_query(sql)
+        if not dialect.inline_indexes:
+            for index_name, columns in cls._indexes:
+                run_query(f"CREATE INDEX IF NOT EXISTS {index_name} "
+                          f"ON {cls._table} ({dialect.index_columns(columns)})")
+
+    @classmethod
+    def create_indexes(cls) -> List[str]:
+        """
+        Create the declared indexes an existing table is missing, e.g. one created
+        before they were declared. Returns the names of the indexes created.
+        """
+        dialect = get_backend().dialect
+        sql, params = dialect.index_names_sql(cls._table)
+        # The schema of the primary, where the indexes are created
+        rows = run_query(sql, params=params, as_tuples=True, using=primary_database())
+        existing = {row[0].lower() for row in rows}
+        created = []
+        for index_name, columns in cls._indexes:
+            if index_name.lower() not in existing:
+                run_query(f"CREATE INDEX {index_name} ON {cls._table} ({dialect.index_columns(columns)})")
+                created.append(index_name)
+        return created
 
     @classmethod
     def get_primary_key_field(cls) -> Any:
-        for field in cls._fields.values():
-            if field.primary_key:
-                return field
-        raise RuntimeError(f"No primary key defined for table {cls._table}")
+        # Found once by ModelMeta
+        return cls._pk_field
@@ -0,0 +1,420 @@
+import asyncio
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+
+class PoolTimeout(RuntimeError):
+    """Raised when no connection could be checked out before the timeout."""
+
+
+# Returned by _PoolBase._take() when the caller has to wait for a connection
+_WAIT = object()
+
+
+class _PoolBase:
+    """
+    Bookkeeping shared by ConnectionPool and AsyncConnectionPool: sizing, connection
+    ages, the closed flag and the counters. Subclasses only differ in how they lock,
+    wait for a free connection and call the (sync or async) connection callbacks.
+    """
+
+    def __init__(self, connect: Callable, size: int, timeout: float, recycle: Optional[float],
+                 ping_after: Optional[float], ping: Optional[Callable], reset: Optional[Callable],
+                 close: Optional[Callable]):
+        if size < 1:
+            raise ValueError("Pool size must be at least 1")
+        self._connect = connect
+        self.size = size
+        self.timeout = timeout
+        self.recycle = recycle
+        self.ping_after = ping_after
+        self._ping = ping
+        self._reset = reset
+        self._close = close
+
+        self._idle: List[Any] = []          # LIFO, so warm connections are reused first
+        self._meta: Dict[int, List[float]] = {}  # id(conn) -> [created_at, last_used]
+        self._open = 0
+        # Set by close_all(): connections released afterwards are closed, not kept
+        self._closed = False
+        self._stats = {
+            "checkouts": 0,
+            "waits": 0,
+            "wait_time": 0.0,
+            "timeouts": 0,
+            "created": 0,
+            "recycled": 0,
+            "failed_pings": 0,
+            "discarded": 0,
+        }
+
+    @property
+    def in_use(self) -> int:
+        """Connections currently checked out (read without locking, for load balancing)."""
+        return self._open - len(self._idle)
+
+    # ---------- shared bookkeeping, called under the subclass' lock ----------
+
+    def _take(self) -> Any:
+        """An idle connection, None when a slot was reserved for a new one, or _WAIT."""
+        if self._closed:
+            raise RuntimeError("Connection pool is closed")
+        if self._idle:
+            return self._idle.pop()
+        if self._open < self.size:
+            # Reserve the slot, the connect itself happens outside the lock
+            self._open += 1
+            return None
+        return _WAIT
+
+    def _waited(self) -> None:
+        self._stats["waits"] += 1
+
+    def _timed_out(self, message: str) -> PoolTimeout:
+        self._stats["timeouts"] += 1
+        return PoolTimeout(message)
+
+    def _checked_out(self, wait_time: Optional[float]) -> None:
+        """Count a checkout; `wait_time` is None when it didn't wait."""
+        if wait_time is not None:
+            self._stats["wait_time"] += wait_time
+        self._stats["checkouts"] += 1
+
+    def _created(self, conn: Any) -> None:
+        now = time.monotonic()
+        self._meta[id(conn)] = [now, now]
+        self._stats["created"] += 1
+
+    def _dropped(self, reason: str) -> None:
+        """Count a connection closed by the pool (`reason` is a counter) and free its slot."""
+        self._stats[reason] += 1
+        self._open -= 1
+
+    def _idled(self, conn: Any, meta: List[float]) -> None:
+        meta[1] = time.monotonic()
+        self._idle.append(conn)
+
+    def _shut(self) -> List[Any]:
+        """Mark the pool closed and hand back its idle connections for closing."""
+        self._closed = True
+        idle, self._idle = self._idle, []
+        self._open -= len(idle)
+        return idle
+
+    def _snapshot(self) -> Dict[str, Any]:
+        stats = dict(self._stats)
+        stats["size"] = self.size
+        stats["open"] = self._open
+        stats["idle"] = len(self._idle)
+        stats["in_use"] = self._open - len(self._idle)
+        return stats
+
+    # ---------- decisions, no shared state changed ----------
+
+    def _stale(self, meta: List[float]) -> Optional[str]:
+        """Whether an idle connection is "recycled" or must be pinged ("ping") before use."""
+        if self._expired(meta):
+            return "recycled"
+        if self.ping_after is not None and time.monotonic() - meta[1] >= self.ping_after:
+            return "ping"
+        return None
+
+    def _retired(self, meta: List[float], discard: bool) -> Optional[str]:
+        """Counter a released connection is closed under, None when it goes back to the pool."""
+        if discard or self._closed:
+            return "discarded"
+        if self._expired(meta):
+            return "recycled"
+        return None
+
+    def _expired(self, meta: List[float]) -> bool:
+        return self.recycle is not None and time.monotonic() - meta[0] >= self.recycle
+
+
+class ConnectionPool(_PoolBase):
+    """
+    Thread-safe pool of database connections.
+    Connections are created lazily up to `size`, health-checked when they
+    have been idle for `ping_after` seconds and recycled after `recycle` seconds.
+    """
+
+    def __init__(self, connect: Callable[[], Any], size: int = 5, timeout: float = 30.0,
+                 recycle: Optional[float] = 3600, ping_after: Optional[float] = 30.0,
+                 ping: Optional[Callable[[Any], bool]] = None,
+                 reset: Optional[Callable[[Any], None]] = None,
+                 close: Optional[Callable[[Any], None]] = None):
+        super().__init__(connect, size, timeout, recycle, ping_after, ping, reset,
+                         close or (lambda conn: conn.close()))
+        self._lock = threading.Condition()
+        # ids of the connections checked out by stream readers, see acquire(stream=True)
+        self._streams = set()
+
+    # ---------- checkout / return ----------
+
+    def acquire(self, timeout: Optional[float] = None, stream: bool = False, nested: bool = False) -> Any:
+        """
+        Check a connection out of the pool, creating one if there is room.
+        `stream` marks a checkout held while a result is streamed. A `nested` checkout,
+        made while consuming such a stream, fails at once when streams hold every
+        connection: none of them can be released before this one is served.
+        """
+        timeout = self.timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        waited = False
+        start = time.monotonic()
+
+        with self._lock:
+            while True:
+                conn = self._take()
+                if conn is not _WAIT:
+                    break
+                if nested and len(self._streams) >= self.size:
+                    raise self._timed_out(f"All {self.size} pooled connections are held by streams (iterator()) "
+                                          "and queries made while streaming need another one; raise the pool size")
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise self._timed_out(f"No connection available after {timeout}s (pool size {self.size})")
+                if not waited:
+                    waited = True
+                    self._waited()
+                self._lock.wait(remaining)
+            self._checked_out(time.monotonic() - start if waited else None)
+
+        conn = self._create() if conn is None else self._check(conn)
+        if stream:
+            with self._lock:
+                self._streams.add(id(conn))
+        return conn
+
+    def release(self, conn: Any, discard: bool = False) -> None:
+        """Return a connection to the pool (or close it when `discard` is set)."""
+        if self._streams:
+            with self._lock:
+                self._streams.discard(id(conn))
+        meta = self._meta.get(id(conn))
+        if meta is None:
+            # Not checked out of this pool, it doesn't count towards `size`
+            self._destroy(conn)
+            return
+        if self._retired(meta, discard) is None and self._reset is not None:
+            try:
+                self._reset(conn)
+            except Exception:
+                discard = True
+        reason = self._retired(meta, discard)
+
+        if reason is not None:
+            self._destroy(conn)
+        with self._lock:
+            if reason is None:
+                self._idled(conn, meta)
+            else:
+                self._dropped(reason)
+            self._lock.notify()
+
+    @contextmanager
+    def connection(self, timeout: Optional[float] = None, nested: bool = False):
+        """`with pool.connection() as conn:` checkout that always returns the connection."""
+        conn = self.acquire(timeout, nested=nested)
+        try:
+            yield conn
+        except BaseException:
+            self.release(conn, discard=not self._alive(conn))
+            raise
+        else:
+            self.release(conn)
+
+    # ---------- maintenance ----------
+
+    def close_all(self) -> None:
+        """Close every idle connection. Checked-out connections close when released."""
+        with self._lock:
+            idle = self._shut()
+            self._lock.notify_all()
+        for conn in idle:
+            self._destroy(conn)
+
+    def stats(self) -> Dict[str, Any]:
+        """Snapshot of the pool counters."""
+        with self._lock:
+            return self._snapshot()
+
+    # ---------- internals ----------
+
+    def _create(self) -> Any:
+        try:
+            conn = self._connect()
+        except BaseException:
+            with self._lock:
+                self._open -= 1
+                self._lock.notify()
+            raise
+        with self._lock:
+            self._created(conn)
+        return conn
+
+    def _check(self, conn: Any) -> Any:
+        """Health-check an idle connection, replacing it if it went stale."""
+        reason = self._stale(self._meta[id(conn)])
+        if reason == "ping":
+            reason = None if self._alive(conn) else "failed_pings"
+        if reason is None:
+            return conn
+        with self._lock:
+            self._stats[reason] += 1
+        self._destroy(conn)
+        return self._create()
+
+    def _alive(self, conn: Any) -> bool:
+        if self._ping is None:
+            return True
+        try:
+            return bool(self._ping(conn))
+        except Exception:
+            return False
+
+    def _destroy(self, conn: Any) -> None:
+        self._meta.pop(id(conn), None)
+        try:
+            self._close(conn)
+        except Exception:
+            pass
+
+
+class AsyncConnectionPool(_PoolBase):
+    """
+    asyncio counterpart of ConnectionPool: the same sizing, health checks, recycling and
+    counters, but checkout waits on the event loop instead of blocking a thread.
+    `connect`, `ping`, `reset` and `close` are coroutine functions.
+    """
+
+    def __init__(self, connect: Callable[[], Awaitable[Any]], size: int = 5, timeout: float = 30.0,
+                 recycle: Optional[float] = 3600, ping_after: Optional[float] = 30.0,
+                 ping: Optional[Callable[[Any], Awaitable[bool]]] = None,
+                 reset: Optional[Callable[[Any], Awaitable[None]]] = None,
+                 close: Optional[Callable[[Any], Awaitable[None]]] = None):
+        super().__init__(connect, size, timeout, recycle, ping_after, ping, reset, close)
+        self._cond: Optional[asyncio.Condition] = None
+
+    @property
+    def _condition(self) -> asyncio.Condition:
+        # Created lazily so the pool binds to the loop that first uses it
+        if self._cond is None:
+            self._cond = asyncio.Condition()
+        return self._cond
+
+    async def acquire(self, timeout: Optional[float] = None) -> Any:
+        """Check a connection out of the pool, creating one if there is room."""
+        timeout = self.timeout if timeout is None else timeout
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        start = loop.time()
+        waited = False
+
+        async with self._condition:
+            while True:
+                conn = self._take()
+                if conn is not _WAIT:
+                    break
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    raise self._timed_out(f"No connection available after {timeout}s (pool size {self.size})")
+                if not waited:
+                    waited = True
+                    self._waited()
+                try:
+                    await asyncio.wait_for(self._condition.wait(), remaining)
+                except asyncio.TimeoutError:
+                    pass
+            self._checked_out(loop.time() - start if waited else None)
+
+        if conn is None:
+            return await self._create()
+        return await self._check(conn)
+
+    async def release(self, conn: Any, discard: bool = False) -> None:
+        """Return a connection to the pool (or close it when `discard` is set)."""
+        meta = self._meta.get(id(conn))
+        if meta is None:
+            # Not checked out of this pool, it doesn't count towards `size`
+            await self._destroy(conn)
+            return
+        if self._retired(meta, discard) is None and self._reset is not None:
+            try:
+                await self._reset(conn)
+            except Exception:
+                discard = True
+        reason = self._retired(meta, discard)
+
+        if reason is not None:
+            await self._destroy(conn)
+        async with self._condition:
+            if reason is None:
+                self._idled(conn, meta)
+            else:
+                self._dropped(reason)
+            self._condition.notify()
+
+    @asynccontextmanager
+    async def connection(self, timeout: Optional[float] = None):
+        """`async with pool.connection() as conn:` checkout that always returns the connection."""
+        conn = await self.acquire(timeout)
+        try:
+            yield conn
+        except BaseException:
+            await self.release(conn, discard=not await self._alive(conn))
+            raise
+        else:
+            await self.release(conn)
+
+    async def close_all(self) -> None:
+        """Close every idle connection. Checked-out connections close when released."""
+        async with self._condition:
+            idle = self._shut()
+            self._condition.notify_all()
+        for conn in idle:
+            await self._destroy(conn)
+
+    def stats(self) -> Dict[str, Any]:
+        """Snapshot of the pool counters."""
+        return self._snapshot()
+
+    async def _create(self) -> Any:
+        try:
+            conn = await self._connect()
+        except BaseException:
+            async with self._condition:
+                self._open -= 1
+                self._condition.notify()
+            raise
+        self._created(conn)
+        return conn
+
+    async def _check(self, conn: Any) -> Any:
+        reason = self._stale(self._meta[id(conn)])
+        if reason == "ping":
+            reason = None if await self._alive(conn) else "failed_pings"
+        if reason is None:
+            return conn
+        self._stats[reason] += 1
+        await self._destroy(conn)
+        return await self._create()
+
+    async def _alive(self, conn: Any) -> bool:
+        if self._ping is None:
+            return True
+        try:
+            return bool(await self._ping(conn))
+        except Exception:
+            return False
+
+    async def _destroy(self, conn: Any) -> None:
+        self._meta.pop(id(conn), None)
+        if self._close is None:
+            return
+        try:
+            await self._close(conn)
+        except Exception:
+            pass
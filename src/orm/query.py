@@ -1,43 +1,849 @@
-from typing import Any, List
-from .connection import run_query
+from contextlib import aclosing, closing, nullcontext
+from typing import Any, AsyncIterator, Dict, Iterator, List
+from .aggregates import Aggregate
+from .aio import arun_query, astream_query, get_async_backend
+from .connection import run_query, get_backend, stream_query, in_atomic, current_database, streaming, \
+    using as using_database
+from . import cache, columns
+from .fields import ForeignKey
+from . import identity
+
+
+# Parameter marker of stored WHERE clauses, replaced by the dialect's when the
+# statement is compiled for the backend that runs it
+PARAM = "%s"
+
+
+def _relation_tree(model_cls: Any, paths) -> Dict[str, dict]:
+    """Turn ["user", "user__company"] into {"user": {"company": {}}}, checking each step is a ForeignKey."""
+    tree: Dict[str, dict] = {}
+    for path in paths:
+        node, model = tree, model_cls
+        for name in path.split("__"):
+            field = model._fields.get(name)
+            if not isinstance(field, ForeignKey):
+                raise ValueError(f"'{name}' is not a ForeignKey of {model.__name__}")
+            node = node.setdefault(name, {})
+            model = field.reference_model
+    return tree
+
+
+def _fk_tree(model_cls: Any, path=()) -> Dict[str, Any]:
+    """
+    Every ForeignKey chain of a model as a relation tree. Where a chain comes back
+    to a model already on it, the node is None: those objects are loaded with lazy ForeignKeys.
+    """
+    path = path + (model_cls,)
+    tree: Dict[str, Any] = {}
+    for name, field in model_cls._fields.items():
+        if isinstance(field, ForeignKey):
+            ref_model = field.reference_model
+            tree[name] = None if ref_model in path else _fk_tree(ref_model, path)
+    return tree
+
+
+def _prefetch_sql(model_cls: Any, rows: List[dict], name: str, dialect):
+    """The chunked `pk IN (...)` SELECTs loading ForeignKey `name` of `rows`."""
+    ref_model = model_cls._fields[name].reference_model
+    ref_pk = ref_model._pk_name
+    ids = list({row[name] for row in rows if row[name] is not None})
+    for start in range(0, len(ids), dialect.max_params):
+        chunk = ids[start:start + dialect.max_params]
+        yield f"SELECT * FROM {ref_model._table} WHERE {ref_pk} IN ({dialect.placeholders(len(chunk))})", \
+            tuple(chunk)
+
+
+def _attach(model_cls, rows, related, name, ref_rows, ref_related):
+    """Build the loaded objects of ForeignKey `name` and put them in each row's `related`."""
+    ref_model = model_cls._fields[name].reference_model
+    ref_pk = ref_model._pk_name
+    if ref_related is None:
+        load = ref_model._from_partial_row
+        objects = {r[ref_pk]: load(r) for r in ref_rows}
+    else:
+        load = ref_model._row_loader
+        objects = {r[ref_pk]: load(r, rel) for r, rel in zip(ref_rows, ref_related)}
+    identity_map = identity.current()
+    if identity_map is not None and ref_related is not None:
+        objects = {pk: identity_map.adopt(obj) for pk, obj in objects.items()}
+    for row, rel in zip(rows, related):
+        rel[name] = objects.get(row[name])
+
+
+def _prefetch(model_cls: Any, rows: List[dict], tree: Dict[str, dict]) -> List[Dict[str, Any]]:
+    """
+    Load the ForeignKeys in `tree` for all `rows` with one IN (...) query per relation.
+    Returns the `related` mapping to pass to from_row for each row.
+    """
+    related: List[Dict[str, Any]] = [{} for _ in rows]
+    dialect = get_backend().dialect
+    for name, subtree in tree.items():
+        ref_model = model_cls._fields[name].reference_model
+        ref_rows: List[dict] = []
+        for sql, params in _prefetch_sql(model_cls, rows, name, dialect):
+            ref_rows.extend(run_query(sql, params=params))
+        ref_related = None if subtree is None else _prefetch(ref_model, ref_rows, subtree)
+        _attach(model_cls, rows, related, name, ref_rows, ref_related)
+    return related
+
+
+async def _aprefetch(model_cls: Any, rows: List[dict], tree: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """async _prefetch()."""
+    related: List[Dict[str, Any]] = [{} for _ in rows]
+    dialect = get_async_backend().dialect
+    for name, subtree in tree.items():
+        ref_model = model_cls._fields[name].reference_model
+        ref_rows: List[dict] = []
+        for sql, params in _prefetch_sql(model_cls, rows, name, dialect):
+            ref_rows.extend(await arun_query(sql, params=params))
+        ref_related = None if subtree is None else await _aprefetch(ref_model, ref_rows, subtree)
+        _attach(model_cls, rows, related, name, ref_rows, ref_related)
+    return related
 
 
 class QuerySet:
+    """
+    Lazy, chainable query over one model.
+    filter/exclude/order_by/limit return new QuerySets without touching the database;
+    the query runs on iteration, len(), bool() or indexing and the results are cached.
+    """
+
     def __init__(self, model_cls: Any):
         self.model_cls = model_cls
         self._where_clauses = []
+        self._params = []
+        self._select_related = []
+        self._prefetch_related = []
+        self._order_by = []
+        self._limit = None
+        self._offset = 0
+        # Models with Meta.slots hydrate from tuple cursors by default
+        self._tuple_rows = model_cls._slots
+        # values()/values_list(): ("dict" | "tuple" | "flat", field names)
+        self._values = None
+        # Columns left out by only()/defer()
+        self._deferred = frozenset()
+        # Seconds results may be served from the result cache, None = always query
+        self._cache_ttl = model_cls.cache_ttl
+        # Database named by using(), None = let the router decide
+        self._using = None
+        self._result_cache = None
+
+    def _clone(self) -> "QuerySet":
+        clone = self.__class__(self.model_cls)
+        clone._where_clauses = list(self._where_clauses)
+        clone._params = list(self._params)
+        clone._select_related = list(self._select_related)
+        clone._prefetch_related = list(self._prefetch_related)
+        clone._order_by = list(self._order_by)
+        clone._limit = self._limit
+        clone._offset = self._offset
+        clone._tuple_rows = self._tuple_rows
+        clone._values = self._values
+        clone._deferred = self._deferred
+        clone._cache_ttl = self._cache_ttl
+        clone._using = self._using
+        return clone
 
-    def filter(self, **conditions) -> List[Any]:
+    def _check_fields(self, names):
+        for name in names:
+            if name not in self.model_cls._fields:
+                raise ValueError(f"Unknown field '{name}' for {self.model_cls.__name__}")
+
+    def _conditions_sql(self, conditions):
+        """`col = %s AND ...` for the given conditions plus their parameters (PARAM markers)."""
+        table = self.model_cls._table
+        clauses, params = [], []
         for k, v in conditions.items():
-            
-            clause = f"{k} = '{v}'"
-            self._where_clauses.append(clause)
-        return self.all()
+            if k not in self.model_cls._fields:
+                raise ValueError(f"Unknown field '{k}' for {self.model_cls.__name__}")
+            # Model instances passed for a ForeignKey compare by their primary key
+            if hasattr(v, "_fields"):
+                v = getattr(v, v.get_primary_key_field().name)
+            if v is None:
+                clauses.append(f"{table}.{k} IS NULL")
+            else:
+                clauses.append(f"{table}.{k} = {PARAM}")
+                params.append(v)
+        return " AND ".join(clauses), params
+
+    # ---------- chaining ----------
+
+    def filter(self, **conditions) -> "QuerySet":
+        clone = self._clone()
+        if conditions:
+            sql, params = self._conditions_sql(conditions)
+            clone._where_clauses.append(sql)
+            clone._params.extend(params)
+        return clone
+
+    def exclude(self, **conditions) -> "QuerySet":
+        clone = self._clone()
+        if conditions:
+            sql, params = self._conditions_sql(conditions)
+            clone._where_clauses.append(f"NOT ({sql})")
+            clone._params.extend(params)
+        return clone
+
+    def order_by(self, *fields) -> "QuerySet":
+        """Sort by the given fields, prefix a name with `-` for descending order."""
+        clone = self._clone()
+        for name in fields:
+            desc = name.startswith("-")
+            column = name.lstrip("-")
+            if column not in self.model_cls._fields:
+                raise ValueError(f"Unknown field '{column}' for {self.model_cls.__name__}")
+            clone._order_by.append(f"{self.model_cls._table}.{column} {'DESC' if desc else 'ASC'}")
+        return clone
+
+    def limit(self, count: int, offset: int = None) -> "QuerySet":
+        """LIMIT the query to `count` rows, keeping the current offset unless one is given."""
+        clone = self._clone()
+        clone._limit = count
+        if offset is not None:
+            clone._offset = offset
+        return clone
+
+    def select_related(self, *fields) -> "QuerySet":
+        """
+        Load the given ForeignKeys in the same query with a LEFT JOIN.
+        Follow chains with `__`, e.g. select_related("user__company").
+        """
+        _relation_tree(self.model_cls, fields)
+        clone = self._clone()
+        clone._select_related.extend(fields)
+        return clone
+
+    def prefetch_related(self, *fields) -> "QuerySet":
+        """
+        Load the given ForeignKeys with one `WHERE pk IN (...)` query per relation
+        once the main query has run. Chains use `__` like select_related.
+        """
+        _relation_tree(self.model_cls, fields)
+        clone = self._clone()
+        clone._prefetch_related.extend(fields)
+        return clone
+
+    def all(self) -> "QuerySet":
+        return self._clone()
+
+    def paginate_by_key(self, key: str = None, page_size: int = 1000, after: Any = None) -> "KeysetPaginator":
+        """
+        Page through the results by key instead of OFFSET: each page is
+        `WHERE key > last ORDER BY key LIMIT page_size`, so deep pages cost the same as
+        the first. `key` must be the primary key (default) or a unique, non-nullable field; prefix it
+        with `-` to walk downwards. Resume a job with `after=paginator.last_key`.
+        """
+        return KeysetPaginator(self, key or self.model_cls._pk_name, page_size, after)
+
+    def tuple_rows(self, enabled: bool = True) -> "QuerySet":
+        """
+        Fetch rows as plain tuples (selected in column order) and assign them by position,
+        skipping the per-row dict. Ignored when select_related/prefetch_related are used.
+        """
+        clone = self._clone()
+        clone._tuple_rows = enabled
+        return clone
+
+    def values(self, *fields) -> "QuerySet":
+        """Rows as dicts of the given columns (all by default); ForeignKeys stay raw ids."""
+        self._check_fields(fields)
+        clone = self._clone()
+        clone._values = ("dict", fields or self.model_cls._columns)
+        return clone
+
+    def values_list(self, *fields, flat: bool = False) -> "QuerySet":
+        """Rows as tuples of the given columns, or single values with `flat=True`."""
+        self._check_fields(fields)
+        if flat and len(fields) != 1:
+            raise ValueError("values_list(flat=True) takes exactly one field")
+        clone = self._clone()
+        clone._values = ("flat" if flat else "tuple", fields or self.model_cls._columns)
+        return clone
+
+    def only(self, *fields) -> "QuerySet":
+        """
+        Load instances with just these columns (plus the primary key). The others are
+        read on first access, and ForeignKeys are resolved on first access.
+        """
+        self._check_fields(fields)
+        clone = self._clone()
+        keep = set(fields) | {self.model_cls._pk_name}
+        clone._deferred = frozenset(name for name in self.model_cls._columns if name not in keep)
+        return clone
+
+    def defer(self, *fields) -> "QuerySet":
+        """Leave these columns out of the SELECT; they are read on first access."""
+        self._check_fields(fields)
+        if self.model_cls._pk_name in fields:
+            raise ValueError("The primary key can't be deferred")
+        clone = self._clone()
+        clone._deferred = self._deferred | frozenset(fields)
+        return clone
+
+    def cache(self, ttl: float = 60) -> "QuerySet":
+        """
+        Serve this query from the result cache for up to `ttl` seconds.
+        Any ORM write to the tables it reads drops the cached result.
+        """
+        clone = self._clone()
+        clone._cache_ttl = ttl
+        return clone
+
+    def no_cache(self) -> "QuerySet":
+        """Always query the database, also for models with a `cache_ttl`."""
+        clone = self._clone()
+        clone._cache_ttl = None
+        return clone
+
+    def using(self, name: str) -> "QuerySet":
+        """
+        Run this query on the named database of the router, e.g. using("primary") to
+        read rows just written. ForeignKeys resolved while loading use it too.
+        """
+        clone = self._clone()
+        clone._using = name
+        return clone
+
+    def _routed(self):
+        """Context in which the follow-up queries of loading (ForeignKeys, prefetch) run."""
+        return using_database(self._using) if self._using is not None else nullcontext()
+
+    def _uses_tuples(self) -> bool:
+        if self._values is not None:
+            return self._values[0] != "dict"
+        if self._deferred:
+            return False
+        return self._tuple_rows and not self._select_related and not self._prefetch_related
+
+    def _partial(self) -> bool:
+        """True when only()/defer() apply, i.e. partial instances are built."""
+        return self._values is None and bool(self._deferred)
+
+    # ---------- evaluation ----------
 
     def get(self, **conditions):
-        for k, v in conditions.items():
-            clause = f"{k} = '{v}'"
-            self._where_clauses.append(clause)
-        if self.all():
-            return self.all()[0]
-        return None
+        """First object matching the conditions, or None."""
+        results = self.filter(**conditions)[:1]
+        return results[0] if results else None
+
+    def __iter__(self):
+        self._fetch_all()
+        return iter(self._result_cache)
+
+    def __len__(self):
+        self._fetch_all()
+        return len(self._result_cache)
+
+    def __bool__(self):
+        self._fetch_all()
+        return bool(self._result_cache)
 
+    def __getitem__(self, key):
+        if self._result_cache is not None:
+            return self._result_cache[key]
 
-    def all(self) -> List[Any]:
-        sql = f"SELECT * FROM {self.model_cls._table}"
+        if isinstance(key, slice):
+            if (key.start is not None and key.start < 0) or (key.stop is not None and key.stop < 0) \
+                    or key.step not in (None, 1):
+                # Negative indexes and steps need the whole result
+                self._fetch_all()
+                return self._result_cache[key]
+            start = key.start or 0
+            clone = self._clone()
+            clone._offset = self._offset + start
+            if key.stop is not None:
+                count = max(0, key.stop - start)
+                if self._limit is not None:
+                    count = min(count, max(0, self._limit - start))
+                clone._limit = count
+            elif self._limit is not None:
+                clone._limit = max(0, self._limit - start)
+            return clone
 
-        if self._where_clauses:
-            where_sql = " AND ".join(self._where_clauses)
-            sql += f" WHERE {where_sql}"
+        if key < 0:
+            self._fetch_all()
+            return self._result_cache[key]
+        results = list(self[key:key + 1])
+        if not results:
+            raise IndexError("QuerySet index out of range")
+        return results[0]
 
+    def _query(self, sql: str, params, as_tuples: bool = False):
+        """run_query() through the result cache when it applies to this QuerySet."""
+        store = cache.get_cache()
+        # Inside a transaction the rows may be uncommitted, they are never cached
+        if self._cache_ttl is None or store is None or in_atomic():
+            return run_query(sql, params=params, as_tuples=as_tuples, using=self._using)
+        # A named database (e.g. the primary, for read-after-write) doesn't share entries
+        # with the router's replicas
+        key = (sql, params, as_tuples, self._using or current_database())
+        rows = store.get(key)
+        if rows is cache.MISSING:
+            tables = self._tables()
+            version = store.version(tables)
+            rows = run_query(sql, params=params, as_tuples=as_tuples, using=self._using)
+            store.set(key, rows, self._cache_ttl, tables, version)
+        # The cached list is shared, hand out a copy (and copies of values() dicts)
+        if self._values is not None and self._values[0] == "dict":
+            return [dict(row) for row in rows]
+        return list(rows)
 
-        rows = run_query(sql)
-        # Use the model's from_row method to properly resolve ForeignKeys
-        return [self.model_cls.from_row(row) for row in rows]  # ✅ Change this line
+    def _tables(self):
+        """Tables this query reads: the model's and those joined by select_related."""
+        tables = {self.model_cls._table}
+        pending = [(self.model_cls, _relation_tree(self.model_cls, self._select_related))]
+        while pending:
+            model, tree = pending.pop()
+            for name, subtree in tree.items():
+                ref_model = model._fields[name].reference_model
+                tables.add(ref_model._table)
+                pending.append((ref_model, subtree))
+        return tuple(sorted(tables))
+
+    def _where_sql(self, dialect) -> str:
+        if not self._where_clauses:
+            return ""
+        where = " WHERE " + " AND ".join(self._where_clauses)
+        if dialect.placeholder != PARAM:
+            where = where.replace(PARAM, dialect.placeholder)
+        return where
+
+    def _check_mutable(self, action: str):
+        if self._limit is not None or self._offset or self._select_related:
+            raise ValueError(f"Cannot {action} a sliced, limited or joined QuerySet")
+
+    def update(self, **values) -> int:
+        """
+        UPDATE every matching row with one statement, without loading instances.
+        Returns the number of rows affected.
+        """
+        self._check_mutable("update")
+        if not values:
+            return 0
+        dialect = get_backend().dialect
+        ph = dialect.placeholder
+        assignments, params = [], []
+        for name, value in values.items():
+            field = self.model_cls._fields.get(name)
+            if field is None:
+                raise ValueError(f"Unknown field '{name}' for {self.model_cls.__name__}")
+            if field.primary_key:
+                raise ValueError(f"Cannot update primary key '{name}'")
+            if value is None and not field.nullable:
+                raise ValueError(f"Field '{name}' cannot be null")
+            if hasattr(value, "_fields"):
+                value = getattr(value, value.get_primary_key_field().name)
+            assignments.append(f"{name} = {ph}")
+            params.append(value)
+
+        sql = f"UPDATE {self.model_cls._table} SET {', '.join(assignments)}{self._where_sql(dialect)}"
+        self._result_cache = None
+        count = run_query(sql, params=tuple(params + self._params), using=self._using)
+        self._forget_model()
+        return count
+
+    def delete(self) -> int:
+        """
+        DELETE every matching row with one statement, without loading instances.
+        Returns the number of rows deleted.
+        """
+        self._check_mutable("delete")
+        sql = f"DELETE FROM {self.model_cls._table}{self._where_sql(get_backend().dialect)}"
+        self._result_cache = None
+        count = run_query(sql, params=tuple(self._params), using=self._using)
+        self._forget_model()
+        return count
+
+    def _forget_model(self):
+        # Which mapped instances a set-based write touched is unknown, drop them all
+        identity_map = identity.current()
+        if identity_map is not None:
+            identity_map.discard_model(self.model_cls)
+
+    def _source_sql(self, dialect):
+        """
+        `FROM ... WHERE ...` for SQL-side aggregates. A sliced QuerySet becomes a subquery
+        aliased to the table name, so `table.column` references keep working.
+        """
+        table = self.model_cls._table
+        if self._limit is None and not self._offset:
+            return f" FROM {table}{self._where_sql(dialect)}", tuple(self._params)
+        inner = f"SELECT * FROM {table}{self._where_sql(dialect)}"
+        if self._order_by:
+            inner += f" ORDER BY {', '.join(self._order_by)}"
+        inner += dialect.limit_sql(self._limit, self._offset)
+        return f" FROM ({inner}) AS {table}", tuple(self._params)
+
+    def count(self) -> int:
+        """Number of matching rows, counted by the database (SELECT COUNT(*))."""
+        if self._result_cache is not None:
+            return len(self._result_cache)
+        source, params = self._source_sql(get_backend().dialect)
+        rows = self._query(f"SELECT COUNT(*){source}", params, as_tuples=True)
+        return rows[0][0]
+
+    async def acount(self) -> int:
+        """async count()."""
+        if self._result_cache is not None:
+            return len(self._result_cache)
+        source, params = self._source_sql(get_async_backend().dialect)
+        rows = await arun_query(f"SELECT COUNT(*){source}", params=params, as_tuples=True)
+        return rows[0][0]
+
+    def exists(self) -> bool:
+        """Whether any row matches, without fetching them (SELECT 1 ... LIMIT 1)."""
+        if self._result_cache is not None:
+            return bool(self._result_cache)
+        if self._limit == 0:
+            return False
+        dialect = get_backend().dialect
+        source, params = self._source_sql(dialect)
+        sql = f"SELECT 1{source}{dialect.limit_sql(1)}"
+        return bool(self._query(sql, params, as_tuples=True))
+
+    async def aexists(self) -> bool:
+        """async exists()."""
+        if self._result_cache is not None:
+            return bool(self._result_cache)
+        if self._limit == 0:
+            return False
+        dialect = get_async_backend().dialect
+        source, params = self._source_sql(dialect)
+        sql = f"SELECT 1{source}{dialect.limit_sql(1)}"
+        return bool(await arun_query(sql, params=params, as_tuples=True))
+
+    def aggregate(self, *args: Aggregate, group_by=None, **kwargs: Aggregate):
+        """
+        Compute aggregates in the database:
+        `aggregate(total=Sum("salary"), Count())` -> {"total": ..., "all__count": ...}.
+        With `group_by` (a field name or a list of them) one dict per group is returned,
+        holding the group columns and the aggregates; only order_by() fields that are
+        grouped order the groups.
+        """
+        aggregates = {agg.default_alias(): agg for agg in args}
+        aggregates.update(kwargs)
+        if not aggregates:
+            raise ValueError("aggregate() needs at least one aggregate")
+        for alias, agg in aggregates.items():
+            if not isinstance(agg, Aggregate):
+                raise ValueError(f"'{alias}' is not an aggregate")
+            if agg.field != "*":
+                self._check_fields([agg.field])
+        if isinstance(group_by, str):
+            group_by = [group_by]
+        group_by = list(group_by or [])
+        self._check_fields(group_by)
+
+        table = self.model_cls._table
+        columns = [f"{table}.{name} AS {name}" for name in group_by]
+        columns += [f"{agg.sql(table)} AS {alias}" for alias, agg in aggregates.items()]
+        source, params = self._source_sql(get_backend().dialect)
+        sql = f"SELECT {', '.join(columns)}{source}"
+        if not group_by:
+            return dict(self._query(sql, params)[0])
+
+        grouped = [f"{table}.{name}" for name in group_by]
+        sql += f" GROUP BY {', '.join(grouped)}"
+        if self._limit is None and not self._offset:
+            # Ordering by a column that isn't grouped is rejected under ONLY_FULL_GROUP_BY
+            order_by = [term for term in self._order_by if term.split()[0] in grouped]
+            if order_by:
+                sql += f" ORDER BY {', '.join(order_by)}"
+        return [dict(row) for row in self._query(sql, params)]
+
+    def iterator(self, chunk_size: int = 1000) -> Iterator[Any]:
+        """
+        Stream the results instead of loading them all: rows are fetched `chunk_size`
+        at a time from an unbuffered cursor and turned into instances as they arrive.
+        Every ForeignKey is loaded with one `IN (...)` query per relation and chunk, on a
+        second pooled connection; select_related() and prefetch_related() are covered by
+        that and otherwise ignored. Nothing is cached; stopping early releases the connection.
+        """
+        if self._result_cache is not None:
+            yield from self._result_cache
+            return
+        if self._limit == 0:
+            return
+        tree = {} if self._values is not None or self._deferred else _fk_tree(self.model_cls)
+        qs = self
+        if tree:
+            qs = self._clone()
+            qs._select_related, qs._prefetch_related, qs._tuple_rows = [], [], False
+        sql, params = qs._compile()
+        chunks = stream_query(sql, params=params, chunk_size=chunk_size, as_tuples=qs._uses_tuples(),
+                              using=self._using)
+        load = self.model_cls._row_loader
+        with closing(chunks):
+            for rows in chunks:
+                # Not across the yields, the consumer's own queries aren't routed
+                with self._routed(), streaming():
+                    if tree:
+                        related = _prefetch(self.model_cls, rows, tree)
+                        objects = self._identity([load(row, rel) for row, rel in zip(rows, related)])
+                    else:
+                        objects = qs._build(rows)
+                yield from objects
+
+    def to_columns(self, *fields, chunk_size: int = 10000, use_numpy: bool = None) -> Dict[str, Any]:
+        """
+        The given columns (all by default) as {name: array}, for analytics code.
+        Rows are streamed `chunk_size` at a time from a tuple cursor into one typed
+        array.array per column (int64, float64, bool; DATETIME as int64 microseconds since
+        1970, NULL = NaT) without building dicts or instances. ForeignKeys are raw ids and
+        other columns plain lists. With NumPy installed (or `use_numpy=True`) the arrays
+        are NumPy arrays sharing those buffers, DATETIME ones as datetime64[us].
+        Float NULLs become NaN; NULLs in other typed columns raise ValueError.
+        """
+        self._check_fields(fields)
+        names = fields or self.model_cls._columns
+        numpy = None
+        if use_numpy or use_numpy is None:
+            try:
+                import numpy
+            except ImportError:
+                if use_numpy:
+                    raise ImportError("to_columns(use_numpy=True) requires numpy") from None
+        model_fields = [self.model_cls._fields[name] for name in names]
+        if self._limit == 0:
+            return columns.read_columns(model_fields, (), numpy)
+        sql, params = self.values_list(*names)._compile()
+        chunks = stream_query(sql, params=params, chunk_size=chunk_size, as_tuples=True, using=self._using)
+        with closing(chunks):
+            return columns.read_columns(model_fields, chunks, numpy)
+
+    async def aiterator(self, chunk_size: int = 1000) -> AsyncIterator[Any]:
+        """
+        async iterator(): `async for obj in qs.aiterator()`. Rows are streamed in chunks and
+        every ForeignKey is loaded up front with one `IN (...)` query per relation and chunk,
+        so nothing blocks the loop while instances are built. select_related() and
+        prefetch_related() are covered by that and otherwise ignored.
+        """
+        if self._result_cache is not None:
+            for obj in self._result_cache:
+                yield obj
+            return
+        if self._limit == 0:
+            return
+        tree = {} if self._values is not None or self._deferred else _fk_tree(self.model_cls)
+        qs = self
+        if tree:
+            qs = self._clone()
+            qs._select_related, qs._prefetch_related, qs._tuple_rows = [], [], False
+        sql, params = qs._compile(get_async_backend().dialect)
+        chunks = astream_query(sql, params=params, chunk_size=chunk_size, as_tuples=qs._uses_tuples())
+        async with aclosing(chunks):
+            async for rows in chunks:
+                if not tree:
+                    for obj in qs._build(rows):
+                        yield obj
+                    continue
+                load = self.model_cls._row_loader
+                related = await _aprefetch(self.model_cls, rows, tree)
+                for obj in self._identity([load(row, rel) for row, rel in zip(rows, related)]):
+                    yield obj
+
+    def __repr__(self):
+        return f"<QuerySet {list(self)!r}>"
+
+    def _compile(self, dialect=None):
+        """The SELECT statement and parameters for this QuerySet, for the sync backend's dialect by default."""
+        dialect = dialect or get_backend().dialect
+        table = self.model_cls._table
+        joined = _relation_tree(self.model_cls, self._select_related)
+        if (self._values is not None or self._deferred) and (joined or self._prefetch_related):
+            raise ValueError("values()/only()/defer() can't be combined with select_related/prefetch_related")
+
+        if self._values is not None or self._deferred:
+            if self._values is not None:
+                names = self._values[1]
+            else:
+                names = [name for name in self.model_cls._columns if name not in self._deferred]
+            sql = f"SELECT {', '.join(f'{table}.{name} AS {name}' for name in names)} FROM {table}"
+        elif joined:
+            columns, joins = self._join_sql(self.model_cls, table, "", joined)
+            sql = f"SELECT {', '.join(columns)} FROM {table} {' '.join(joins)}"
+        elif self._uses_tuples():
+            # Explicit columns so tuple positions match the model's column order
+            sql = f"SELECT {self.model_cls._sql(dialect)['columns']} FROM {table}"
+        else:
+            sql = f"SELECT * FROM {table}"
+
+        sql += self._where_sql(dialect)
+        if self._order_by:
+            sql += f" ORDER BY {', '.join(self._order_by)}"
+        sql += dialect.limit_sql(self._limit, self._offset)
+        return sql, tuple(self._params)
+
+    def _fetch_all(self):
+        if self._result_cache is not None:
+            return
+        if self._limit == 0:
+            self._result_cache = []
+            return
+        sql, params = self._compile()
+        rows = self._query(sql, params, as_tuples=self._uses_tuples())
+        with self._routed():
+            self._result_cache = self._build(rows)
+
+    def _build(self, rows: List[Any]) -> List[Any]:
+        if self._values is not None:
+            kind = self._values[0]
+            if kind == "flat":
+                return [row[0] for row in rows]
+            if kind == "tuple":
+                return [tuple(row) for row in rows]
+            return list(rows)
+        if self._partial():
+            load = self.model_cls._from_partial_row
+            return [load(row) for row in rows]
+
+        return self._identity(self._build_instances(rows))
+
+    @staticmethod
+    def _identity(objects: List[Any]) -> List[Any]:
+        """Swap in the instances a session()'s identity map already holds."""
+        identity_map = identity.current()
+        if identity_map is None:
+            return objects
+        adopt = identity_map.adopt
+        return [adopt(obj) for obj in objects]
+
+    def _build_instances(self, rows: List[Any]) -> List[Any]:
+        if self._uses_tuples():
+            load = self.model_cls._tuple_loader
+            return [load(row) for row in rows]
+
+        load = self.model_cls._row_loader
+        if not self._select_related and not self._prefetch_related:
+            return [load(row) for row in rows]
+
+        joined = _relation_tree(self.model_cls, self._select_related)
+        prefetched = _prefetch(self.model_cls, rows,
+                               _relation_tree(self.model_cls, self._prefetch_related))
+
+        objects = []
+        for row, related in zip(rows, prefetched):
+            if joined:
+                related.update(self._split_joined(self.model_cls, row, "", joined))
+            # The model's generated loader resolves the remaining ForeignKeys
+            objects.append(load(row, related))
+        return objects
+
+    @classmethod
+    def _join_sql(cls, model_cls, alias, prefix, tree):
+        """SELECT columns and LEFT JOINs for select_related; joined columns are named `<path>__<column>`."""
+        columns = [f"{alias}.{name} AS {prefix}{name}" for name in model_cls._fields]
+        joins = []
+        for name, subtree in tree.items():
+            ref_model = model_cls._fields[name].reference_model
+            ref_pk = ref_model.get_primary_key_field().name
+            ref_prefix = f"{prefix}{name}__"
+            ref_alias = f"r__{ref_prefix}".rstrip("_")
+            joins.append(f"LEFT JOIN {ref_model._table} AS {ref_alias} "
+                         f"ON {alias}.{name} = {ref_alias}.{ref_pk}")
+            ref_columns, ref_joins = cls._join_sql(ref_model, ref_alias, ref_prefix, subtree)
+            columns.extend(ref_columns)
+            joins.extend(ref_joins)
+        return columns, joins
+
+    @classmethod
+    def _split_joined(cls, model_cls, row, prefix, tree) -> Dict[str, Any]:
+        """Build the joined objects of one row, keyed by ForeignKey name."""
+        related = {}
+        for name, subtree in tree.items():
+            ref_model = model_cls._fields[name].reference_model
+            ref_prefix = f"{prefix}{name}__"
+            if row[ref_prefix + ref_model.get_primary_key_field().name] is None:
+                related[name] = None
+                continue
+            ref_row = {field: row[ref_prefix + field] for field in ref_model._fields}
+            ref_related = cls._split_joined(ref_model, row, ref_prefix, subtree)
+            related[name] = cls._identity([ref_model.from_row(ref_row, ref_related)])[0]
+        return related
+
+
+class KeysetPaginator:
+    """
+    Iterates over pages (lists) of a QuerySet, see QuerySet.paginate_by_key().
+    `last_key` is the key of the last row handed out, the checkpoint to resume from.
+    """
+
+    def __init__(self, queryset: QuerySet, key: str, page_size: int = 1000, after: Any = None):
+        model = queryset.model_cls
+        self.descending = key.startswith("-")
+        self.key = key.lstrip("-")
+        field = model._fields.get(self.key)
+        if field is None:
+            raise ValueError(f"Unknown field '{self.key}' for {model.__name__}")
+        if not (field.primary_key or field.unique):
+            raise ValueError(f"Keyset pagination needs a unique key, '{self.key}' is not")
+        if field.nullable and not field.primary_key:
+            # NULL keys can't be compared with `>`, a page ending on one would never move on
+            raise ValueError(f"Keyset pagination needs a non-nullable key, '{self.key}' allows NULL")
+        if queryset._order_by or queryset._limit is not None or queryset._offset:
+            raise ValueError("paginate_by_key() sets its own ordering and limit")
+        if page_size < 1:
+            raise ValueError("page_size must be at least 1")
+        values = queryset._values
+        if values is not None and self.key not in values[1]:
+            raise ValueError(f"values()/values_list() must include the key '{self.key}'")
+        self.queryset = queryset
+        self.page_size = page_size
+        self.last_key = after
+        # Whether last_key bounds the next page: resuming or past the first page
+        self._started = after is not None
+        self._done = False
+
+    def page_queryset(self) -> QuerySet:
+        """The QuerySet of the next page."""
+        qs = self.queryset.order_by(f"-{self.key}" if self.descending else self.key).limit(self.page_size)
+        if self._started:
+            qs._where_clauses.append(f"{qs.model_cls._table}.{self.key} {'<' if self.descending else '>'} {PARAM}")
+            qs._params.append(self.last_key)
+        return qs
+
+    def next_page(self) -> List[Any]:
+        """Fetch the next page and move past it; an empty list once the rows run out."""
+        if self._done:
+            return []
+        page = list(self.page_queryset())
+        if len(page) < self.page_size:
+            # A short page is the last one, no need to ask for an empty one
+            self._done = True
+        if page:
+            self.last_key = self._key_of(page[-1])
+            self._started = True
+        return page
+
+    def __iter__(self) -> Iterator[List[Any]]:
+        while True:
+            page = self.next_page()
+            if not page:
+                return
+            yield page
+
+    def items(self) -> Iterator[Any]:
+        """The rows one by one, fetched a page at a time."""
+        for page in self:
+            yield from page
+
+    def _key_of(self, item):
+        values = self.queryset._values
+        if values is None:
+            return item._db_value(self.key)
+        kind, names = values
+        if kind == "dict":
+            return item[self.key]
+        if kind == "flat":
+            return item
+        return item[list(names).index(self.key)]
 
 
 # Optional: helper method for models
 class QueryableMixin:
+    __slots__ = ()
+
     @classmethod
     def objects(cls) -> QuerySet:
         return QuerySet(cls)
@@ -0,0 +1,57 @@
+import itertools
+from typing import Dict, Iterable, List, Optional
+
+from .backends import Backend
+
+
+class Router:
+    """
+    Named databases: one primary plus read replicas.
+    Writes and transactions go to the primary, SELECTs outside a transaction to a
+    replica picked round-robin or by the fewest connections in use ("least_busy").
+    """
+    strategies = ("round_robin", "least_busy")
+
+    def __init__(self, databases: Dict[str, Backend], primary: str = "primary",
+                 replicas: Optional[Iterable[str]] = None, strategy: str = "round_robin"):
+        if primary not in databases:
+            raise ValueError(f"Unknown primary database '{primary}'")
+        if strategy not in self.strategies:
+            raise ValueError(f"Unknown strategy '{strategy}', expected one of {', '.join(self.strategies)}")
+        if replicas is None:
+            replicas = [name for name in databases if name != primary]
+        replicas = list(replicas)
+        unknown = [name for name in replicas if name not in databases]
+        if unknown:
+            raise ValueError(f"Unknown replica database(s): {', '.join(unknown)}")
+
+        self.databases = dict(databases)
+        self.primary_name = primary
+        self.primary = databases[primary]
+        self.replica_names: List[str] = replicas
+        self.replicas: List[Backend] = [databases[name] for name in replicas]
+        self.strategy = strategy
+        self._turn = itertools.count()
+
+    def get(self, name: str) -> Backend:
+        backend = self.databases.get(name)
+        if backend is None:
+            raise ValueError(f"Unknown database '{name}', configured: {', '.join(self.databases)}")
+        return backend
+
+    def read_backend(self) -> Backend:
+        """The backend the next SELECT should use (the primary when there are no replicas)."""
+        replicas = self.replicas
+        if not replicas:
+            return self.primary
+        if self.strategy == "least_busy":
+            return min(replicas, key=lambda backend: backend.pool.in_use)
+        # itertools.count is thread-safe under the GIL
+        return replicas[next(self._turn) % len(replicas)]
+
+    def write_backend(self) -> Backend:
+        return self.primary
+
+    def close(self) -> None:
+        for backend in self.databases.values():
+            backend.close()